@@ -0,0 +1,71 @@
+from bisect import bisect_left
+
+from django.db import connection
+
+from recipes.cache import get_version
+from recipes.models import Ingredient
+
+INGREDIENT_SEARCH_LIMIT = 50
+TRIGRAM_MIN_LENGTH = 3
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+
+
+class IngredientPrefixIndex:
+    """Отсортированный по названию индекс ингредиентов в памяти процесса.
+
+    Поиск по префиксу выполняется бинарным поиском, совпадения внутри
+    названия - проходом по уже загруженным строкам без обращения к БД.
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: row['name'].lower())
+        self.keys = [row['name'].lower() for row in rows]
+        self.rows = rows
+
+    def search(self, query, limit):
+        query = query.lower()
+        result = []
+        position = bisect_left(self.keys, query)
+        while (position < len(self.keys) and len(result) < limit
+               and self.keys[position].startswith(query)):
+            result.append(self.rows[position])
+            position += 1
+        if len(result) < limit:
+            for key, row in zip(self.keys, self.rows):
+                if query in key and not key.startswith(query):
+                    result.append(row)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+_prefix_index = (None, None)
+
+
+def get_prefix_index():
+    """Индекс пересобирается при смене версии справочника ингредиентов."""
+    global _prefix_index
+    version = get_version('ingredients')
+    if _prefix_index[0] != version:
+        _prefix_index = (version, IngredientPrefixIndex(
+            Ingredient.objects.values(*INGREDIENT_FIELDS)))
+    return _prefix_index[1]
+
+
+def search_in_database(query, limit):
+    """Поиск по индексам PostgreSQL: сначала совпадения по префиксу
+    (text_pattern_ops), затем по подстроке (pg_trgm)."""
+    queryset = Ingredient.objects.order_by('name').values(*INGREDIENT_FIELDS)
+    result = list(queryset.filter(name__istartswith=query)[:limit])
+    if len(result) < limit and len(query) >= TRIGRAM_MIN_LENGTH:
+        result += queryset.filter(name__icontains=query).exclude(
+            name__istartswith=query)[:limit - len(result)]
+    return result
+
+
+def search_ingredients(query, limit=INGREDIENT_SEARCH_LIMIT):
+    """Подсказки ингредиентов: сначала начинающиеся с query,
+    затем содержащие query, не более limit строк."""
+    if connection.vendor == 'postgresql':
+        return search_in_database(query, limit)
+    return get_prefix_index().search(query, limit)
@@ -1,14 +1,73 @@
 import base64
+import binascii
+import hashlib
+from tempfile import SpooledTemporaryFile
 
-from django.core.files.base import ContentFile
+from django.core.files import File
+from PIL import Image
 from rest_framework import serializers
 
+from recipes.config import MAX_IMAGE_PIXELS, MAX_IMAGE_SIZE
+
+# Кратно 4, чтобы каждый кусок base64 декодировался отдельно.
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+def decode_base64(data):
+    """Декодирует base64 по частям во временный файл.
+
+    Возвращает файл и sha256 содержимого. Размер проверяется по длине
+    строки до декодирования.
+    """
+    if len(data) // 4 * 3 > MAX_IMAGE_SIZE:
+        raise serializers.ValidationError(
+            f'Размер изображения больше {MAX_IMAGE_SIZE} байт.')
+    file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    digest = hashlib.sha256()
+    try:
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunk = base64.b64decode(
+                data[start:start + CHUNK_SIZE], validate=True)
+            digest.update(chunk)
+            file.write(chunk)
+    except (binascii.Error, ValueError):
+        file.close()
+        raise serializers.ValidationError('Неверные данные base64.')
+    file.seek(0)
+    return file, digest.hexdigest()
+
+
+def check_image(file):
+    """По заголовку изображения, не декодируя пиксели, проверяет формат
+    и размер. Возвращает расширение файла."""
+    try:
+        with Image.open(file) as image:
+            extension = IMAGE_FORMATS.get(image.format)
+            pixels = image.width * image.height
+    except (OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Файл не является изображением.')
+    if extension is None:
+        raise serializers.ValidationError(
+            'Поддерживаются изображения ' + ', '.join(IMAGE_FORMATS) + '.')
+    if pixels > MAX_IMAGE_PIXELS:
+        raise serializers.ValidationError(
+            f'Изображение больше {MAX_IMAGE_PIXELS} пикселей.')
+    file.seek(0)
+    return extension
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            imgstr = data.partition(';base64,')[2]
+            file, digest = decode_base64(imgstr)
+            data = File(file, name=f'{digest}.{check_image(file)}')
 
         return super().to_internal_value(data)
@@ -1,4 +1,4 @@
-from users.models import Subscription
+from api.representations import get_subscribed_ids
 
 
 class IsSubscribedMixin:
@@ -6,4 +6,10 @@ class IsSubscribedMixin:
         user = self.context.get('request').user
         if not user.is_authenticated:
             return False
-        return Subscription.objects.filter(user=user, author=obj).exists()
+        return obj.id in self.get_subscribed_ids(user)
+
+    def get_subscribed_ids(self, user):
+        """Загружает подписки пользователя один раз на запрос."""
+        if 'subscribed_ids' not in self.context:
+            self.context['subscribed_ids'] = get_subscribed_ids(user)
+        return self.context['subscribed_ids']
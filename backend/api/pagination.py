@@ -1,6 +1,250 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import partial
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (BasePagination, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from recipes.cache import FRAGMENTS, get_or_set
+from recipes.feed import get_feed_page
+
+
+def estimate_count(model):
+    """Оценка числа строк таблицы по статистике планировщика PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class CountingPaginator(Paginator):
+    """Paginator с кэшированным или оценочным количеством объектов."""
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_timeout=None, estimate_threshold=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+        self.estimate_threshold = estimate_threshold
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        if self.estimate_threshold is not None:
+            estimate = estimate_count(self.object_list.model)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                self.approximate = True
+                return estimate
+        if self.count_key is None:
+            return self.get_exact_count()
+        return get_or_set(FRAGMENTS, self.count_key, self.get_exact_count,
+                          self.count_timeout)
+
+    def get_exact_count(self):
+        return super().count
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+
+class SubscriptionCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = '-id'
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничная пагинация с курсорным режимом по запросу.
+
+    Если задан cursor_pagination_class, параметр pagination=cursor
+    (или уже полученный cursor) переключает выдачу на курсорную
+    пагинацию, стоимость которой не растёт с глубиной прокрутки.
+    Без параметра формат ответа прежний.
+
+    При заданном count_cache_timeout количество объектов кэшируется
+    по нормализованному набору фильтров, а для списка без фильтров
+    на PostgreSQL берётся оценка планировщика, если таблица больше
+    count_estimate_threshold строк. Такой ответ помечается полем
+    count_approximate.
+
+    Курсор умеет только порядок cursor_pagination_class. Запрос курсорной
+    пагинации с параметрами из cursor_unsupported_params, которые задают
+    другой порядок, отклоняется с ошибкой 400.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    pagination_query_param = 'pagination'
+    cursor_pagination_class = None
+    cursor_paginator = None
+    cursor_unsupported_params = ()
+    count_cache_timeout = None
+    count_estimate_threshold = 10000
+    user_query_params = ()
+
+    def use_cursor(self, request):
+        return self.cursor_pagination_class is not None and (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or 'cursor' in request.query_params
+        )
+
+    def get_filter_params(self, request):
+        ignored = (self.page_query_param, self.page_size_query_param,
+                   self.pagination_query_param)
+        return sorted(
+            (name, sorted(values))
+            for name, values in request.query_params.lists()
+            if name not in ignored
+        )
+
+    def get_paginator_options(self, queryset, request):
+        if self.count_cache_timeout is None:
+            return {}
+        filters = self.get_filter_params(request)
+        if not filters:
+            return {
+                'count_key': self.get_count_key(queryset, filters),
+                'count_timeout': self.count_cache_timeout,
+                'estimate_threshold': self.count_estimate_threshold,
+            }
+        if any(name in self.user_query_params for name, _ in filters):
+            # Списки, зависящие от пользователя, считаются точно.
+            return {}
+        return {
+            'count_key': self.get_count_key(queryset, filters),
+            'count_timeout': self.count_cache_timeout,
+        }
+
+    def get_count_key(self, queryset, filters):
+        digest = hashlib.md5(repr(filters).encode()).hexdigest()
+        return f'count:{queryset.model._meta.label_lower}:{digest}'
+
+    def check_cursor_params(self, request):
+        unsupported = [name for name in self.cursor_unsupported_params
+                       if request.query_params.get(name)]
+        if unsupported:
+            raise ValidationError({
+                self.pagination_query_param: (
+                    'Курсорная пагинация несовместима с параметрами: '
+                    f'{", ".join(unsupported)}.')
+            })
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.check_cursor_params(request)
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        self.django_paginator_class = partial(
+            CountingPaginator,
+            **self.get_paginator_options(queryset, request)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        paginator = self.page.paginator
+        response = {'count': paginator.count}
+        if paginator.approximate:
+            response['count_approximate'] = True
+        response.update({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        return Response(response)
+
+
+class RecipePagination(CustomPagination):
+    cursor_pagination_class = RecipeCursorPagination
+    # Популярность и релевантность поиска задают свой порядок выдачи.
+    cursor_unsupported_params = ('ordering', 'search')
+    count_cache_timeout = 30
+    user_query_params = ('is_favorited', 'is_in_shopping_cart')
+
+
+class SubscriptionPagination(CustomPagination):
+    cursor_pagination_class = SubscriptionCursorPagination
+
+
+class FeedPagination(BasePagination):
+    """Keyset-пагинация ленты подписок.
+
+    Курсор хранит дату и id последнего показанного рецепта, поэтому
+    стоимость страницы не зависит от глубины прокрутки. Листать можно
+    только вперёд.
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode()).decode().split('|')
+            position = (parse_datetime(pub_date), int(pk))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        pub_date, pk = position
+        return urlsafe_b64encode(
+            f'{pub_date.isoformat()}|{pk}'.encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        rows = get_feed_page(
+            request.user, self.decode_cursor(request), page_size)
+        self.next_position = (
+            rows[page_size - 1] if len(rows) > page_size else None)
+        ids = [pk for _, pk in rows[:page_size]]
+        recipes = queryset.in_bulk(ids)
+        return [recipes[pk] for pk in ids if pk in recipes]
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
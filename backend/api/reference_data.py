@@ -0,0 +1,49 @@
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+
+from recipes.cache import REFERENCE, get_or_set, get_version
+
+# Срок, после которого JSON устаревшей версии уходит из общего кэша.
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class ReferenceDataCache:
+    """Готовый JSON справочной таблицы в памяти процесса.
+
+    Содержимое пересобирается, только когда меняется версия набора
+    данных в общем кэше; собранный однажды JSON берётся из общего кэша
+    остальными процессами.
+    """
+
+    def __init__(self, name, queryset, fields):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self._entry = None
+
+    def get(self):
+        """Возвращает пару (etag, content)."""
+        version = get_version(self.name)
+        entry = self._entry
+        if entry is None or entry[0] != version:
+            etag, content = get_or_set(
+                REFERENCE, f'reference_data:{self.name}:{version}',
+                self.render, CACHE_TIMEOUT)
+            entry = self._entry = (version, etag, content)
+        return entry[1:]
+
+    def render(self):
+        content = JSONRenderer().render(
+            list(self.queryset.values(*self.fields)))
+        return f'"{hashlib.sha256(content).hexdigest()}"', content
+
+    def response(self, request):
+        etag, content = self.get()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,143 @@
+import csv
+from io import BytesIO
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.negotiation import DefaultContentNegotiation
+
+FONT_NAME = 'ArialMT'
+FONT_SIZE = 12
+PAGE_TOP = 800
+PAGE_BOTTOM = 50
+LINE_HEIGHT = 20
+
+
+def register_fonts():
+    """Регистрирует шрифт списка покупок один раз при запуске."""
+    pdfmetrics.registerFont(TTFont(FONT_NAME, settings.SHOPPING_LIST_FONT))
+
+
+def format_row(row):
+    return (f"{row['name']} ({row['measurement_unit']}) - "
+            f"{row['total_amount']}")
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer:
+    """Базовый рендерер списка покупок.
+
+    Формат выбирается действием по параметру format, а не согласованием
+    DRF, поэтому ошибки остаются в JSON. Рендереры с cache_documents
+    собирают документ целиком методом build(), и его можно кэшировать.
+    """
+    charset = 'utf-8'
+    filename = 'shopping_cart'
+    cache_documents = False
+
+    def get_filename(self):
+        return f'{self.filename}.{self.format}'
+
+    def export(self, rows):
+        return self.document_response(self.build(rows))
+
+    def build(self, rows):
+        raise NotImplementedError
+
+    def document_response(self, content):
+        response = HttpResponse(content, content_type=self.media_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.get_filename()}"')
+        return response
+
+
+class StreamingShoppingListRenderer(ShoppingListRenderer):
+    """Отдаёт список построчно, не собирая документ в памяти."""
+
+    def export(self, rows):
+        response = StreamingHttpResponse(
+            (line.encode(self.charset) for line in self.stream(rows)),
+            content_type=f'{self.media_type}; charset={self.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.get_filename()}"')
+        return response
+
+    def stream(self, rows):
+        raise NotImplementedError
+
+
+class TextShoppingListRenderer(StreamingShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield 'Список покупок:\n'
+        for row in rows:
+            yield f'{format_row(row)}\n'
+
+
+class CSVShoppingListRenderer(StreamingShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ('Ингредиент', 'Единица измерения', 'Количество'))
+        for row in rows:
+            yield writer.writerow((
+                row['name'], row['measurement_unit'], row['total_amount']))
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    cache_documents = True
+
+    def build(self, rows):
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setFont(FONT_NAME, FONT_SIZE)
+        pdf.drawString(100, PAGE_TOP, 'Список покупок:')
+        height = PAGE_TOP - 2 * LINE_HEIGHT
+        for row in rows:
+            if height < PAGE_BOTTOM:
+                pdf.showPage()
+                pdf.setFont(FONT_NAME, FONT_SIZE)
+                height = PAGE_TOP
+            pdf.drawString(100, height, format_row(row))
+            height -= LINE_HEIGHT
+        pdf.showPage()
+        pdf.save()
+        return buffer.getvalue()
+
+
+SHOPPING_LIST_RENDERERS = {
+    renderer.format: renderer
+    for renderer in (PDFShoppingListRenderer, TextShoppingListRenderer,
+                     CSVShoppingListRenderer)
+}
+DEFAULT_SHOPPING_LIST_FORMAT = PDFShoppingListRenderer.format
+
+
+class QueryFormatNegotiation(DefaultContentNegotiation):
+    """Не выбирает рендерер по параметру format.
+
+    Параметр разбирает само действие, а остальные ответы, в том числе
+    ошибки, отдаются первым рендерером, то есть в JSON.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        if self.settings.URL_FORMAT_OVERRIDE in request.query_params:
+            return renderers[0], renderers[0].media_type
+        return super().select_renderer(request, renderers, format_suffix)
@@ -0,0 +1,80 @@
+from django.core.files.storage import default_storage
+
+from recipes.thumbnails import get_list_image_name, thumbnail_storage
+from users.models import Subscription
+
+TAG_FIELDS = ('id', 'name', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name', 'avatar')
+
+
+def file_url(name, request=None, storage=default_storage):
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def get_subscribed_ids(user):
+    """id авторов, на которых подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    return set(Subscription.objects.filter(
+        user=user).values_list('author_id', flat=True))
+
+
+def get_user_row(user):
+    row = {field: getattr(user, field) for field in USER_FIELDS}
+    row['avatar'] = user.avatar.name
+    return row
+
+
+def represent_user(row, request, subscribed_ids):
+    """Пользователь как CustomUserSerializer из строки values()."""
+    return {
+        'email': row['email'],
+        'id': row['id'],
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'is_subscribed': row['id'] in subscribed_ids,
+        'avatar': file_url(row['avatar'], request),
+    }
+
+
+def represent_recipe_fragment(recipe):
+    """Не зависящая от пользователя часть рецепта с подгруженными
+    тегами и ингредиентами; ссылки на файлы относительные."""
+    author = recipe.author
+    list_image = get_list_image_name(recipe)
+    return {
+        'id': recipe.id,
+        'tags': [
+            {'id': tag.id, 'name': tag.name, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            'email': author.email,
+            'id': author.id,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+            'avatar': file_url(author.avatar.name),
+        },
+        'ingredients': [
+            {
+                'id': item.ingredient.id,
+                'amount': int(item.amount),
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+            }
+            for item in recipe.recipes.all()
+        ],
+        'name': recipe.name,
+        'image': file_url(recipe.image.name),
+        'list_image': file_url(list_image, storage=thumbnail_storage),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
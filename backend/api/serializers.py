@@ -1,11 +1,16 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Manager, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
 from api.fields import Base64ImageField
 from api.mixins import IsSubscribedMixin
+from api.representations import represent_recipe_fragment
+from recipes.cache import FRAGMENTS, get_many, set_many
+from recipes.fragments import FRAGMENT_TIMEOUT, get_fragment_keys
 from recipes.models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
-                            ShortLink, Tag)
+                            ShortLink, Tag, get_recipe_prefetches)
+from recipes.signals import recipe_ingredients_changed
 from users.models import CustomUser
 
 User = get_user_model()
@@ -55,7 +60,6 @@ class AvatarSerializer(serializers.ModelSerializer):
 class SubscriptionSerializer(IsSubscribedMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
@@ -67,15 +71,11 @@ class SubscriptionSerializer(IsSubscribedMixin, serializers.ModelSerializer):
         read_only_fields = ('email', 'username')
 
     def get_recipes(self, obj):
-        limit = self.context['request'].query_params.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()[:self.context.get('recipes_limit')]
         return RecipeSerializer(recipes, many=True, context=self.context).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class TagSerializer(serializers.ModelSerializer):
     """Список тэгов."""
@@ -123,7 +123,44 @@ class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+def get_recipe_fragments(recipes):
+    """Фрагменты рецептов одним запросом к кэшу; недостающие
+    собираются с подгрузкой тегов и ингредиентов и кэшируются."""
+    keys = get_fragment_keys(recipes)
+    cached = get_many(FRAGMENTS, list(keys.values()))
+    fragments = {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+    missing = [recipe for recipe in recipes if recipe.pk not in fragments]
+    if missing:
+        prefetch_related_objects(missing, *get_recipe_prefetches())
+        built = {
+            recipe.pk: represent_recipe_fragment(recipe)
+            for recipe in missing
+        }
+        set_many(
+            FRAGMENTS,
+            {keys[recipe_id]: data for recipe_id, data in built.items()},
+            FRAGMENT_TIMEOUT
+        )
+        fragments.update(built)
+    return fragments
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        fragments = get_recipe_fragments(recipes)
+        return [
+            self.child.merge(recipe, fragments[recipe.pk])
+            for recipe in recipes
+        ]
+
+
+class RecipeReadSerializer(IsSubscribedMixin, serializers.ModelSerializer):
+    """Рецепт из кэшированного фрагмента и признаков пользователя."""
     tags = TagSerializer(many=True, read_only=True)
     ingredients = RecipeIngredientSerializer(
         source='recipes',
@@ -139,14 +176,55 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.merge(
+            instance, get_recipe_fragments([instance])[instance.pk])
+
+    def build_absolute_uri(self, url):
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def merge(self, recipe, fragment):
+        image = fragment['image']
+        if self.context.get('thumbnails') and fragment['list_image']:
+            image = fragment['list_image']
+        author = fragment['author']
+        return {
+            'id': fragment['id'],
+            'tags': fragment['tags'],
+            'author': {
+                'email': author['email'],
+                'id': author['id'],
+                'username': author['username'],
+                'first_name': author['first_name'],
+                'last_name': author['last_name'],
+                'is_subscribed': self.get_is_subscribed(recipe.author),
+                'avatar': self.build_absolute_uri(author['avatar']),
+            },
+            'ingredients': fragment['ingredients'],
+            'is_favorited': self.get_is_favorited(recipe),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(recipe),
+            'name': fragment['name'],
+            'image': self.build_absolute_uri(image),
+            'text': fragment['text'],
+            'cooking_time': fragment['cooking_time'],
+        }
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
         return user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
         if user.is_anonymous:
             return False
@@ -237,8 +315,12 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             for ingredient_data in ingredients_data
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        recipe_ingredients_changed.send(
+            sender=RecipeIngredient, recipe_id=recipe.id)
 
     def to_representation(self, instance):
+        # Сигналы сохранения увеличили версию фрагмента в БД.
+        instance.refresh_from_db(fields=['fragment_version'])
         return RecipeReadSerializer(instance,
                                     context=self.context).data
 
@@ -0,0 +1,67 @@
+import hashlib
+import json
+
+from django.db.models import F, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from recipes.cache import FRAGMENTS, USER, get_or_set
+from recipes.models import RecipeIngredient
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def aggregate_shopping_list(user):
+    """Суммирует ингредиенты всех рецептов из корзины пользователя."""
+    return list(
+        RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user=user
+        ).values(
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        ).annotate(total_amount=Sum('amount')).order_by('name')
+    )
+
+
+def get_shopping_list(user):
+    """Список покупок из кэша.
+
+    Ключ содержит версию корзины пользователя, которую сигналы
+    увеличивают при любом изменении корзины или входящих в неё рецептов,
+    поэтому устаревшая запись никогда не будет прочитана.
+    """
+    return get_or_set(
+        USER,
+        f'shopping_list:{user.pk}:{user.shopping_cart_version}',
+        lambda: aggregate_shopping_list(user),
+        SHOPPING_LIST_CACHE_TIMEOUT
+    )
+
+
+def export_shopping_list(request, renderer, rows):
+    """Ответ со списком покупок с поддержкой условных запросов.
+
+    ETag — хэш содержимого списка и формата: при совпадении
+    If-None-Match документ не строится. Документы с cache_documents
+    разделяются одинаковыми списками разных пользователей через кэш.
+    Last-Modified не отдаётся: корзина могла вернуться к прежнему
+    содержимому, и дата первой сборки документа была бы неверной.
+    """
+    digest = hashlib.sha256(json.dumps(
+        [renderer.format, rows], ensure_ascii=False, sort_keys=True
+    ).encode()).hexdigest()
+    etag = f'"{digest}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if renderer.cache_documents:
+            response = renderer.document_response(get_or_set(
+                FRAGMENTS,
+                f'shopping_list_file:{digest}',
+                lambda: renderer.build(rows),
+                SHOPPING_LIST_CACHE_TIMEOUT
+            ))
+        else:
+            response = renderer.export(rows)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,10 +1,29 @@
+from functools import lru_cache
+
 from django.shortcuts import get_object_or_404, redirect
 
+from recipes.cache import REFERENCE, get_or_set
 from recipes.models import ShortLink
 
+SHORT_LINK_CACHE_SIZE = 4096
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24 * 30
 
-def redirect_short_link(request, short_url):
-    short_link = get_object_or_404(
-        ShortLink, short_url=short_url
+
+@lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def get_original_url(short_url):
+    """Адрес по короткой ссылке: LRU процесса, затем общий кэш, затем БД.
+
+    Короткие ссылки не изменяются, поэтому записи не нужно сбрасывать.
+    Отсутствующие ссылки не кэшируются: Http404 проходит мимо lru_cache.
+    """
+    return get_or_set(
+        REFERENCE,
+        f'short_link:{short_url}',
+        lambda: get_object_or_404(
+            ShortLink, short_url=short_url).original_url,
+        SHORT_LINK_CACHE_TIMEOUT
     )
-    return redirect(short_link.original_url)
+
+
+def redirect_short_link(request, short_url):
+    return redirect(get_original_url(short_url))
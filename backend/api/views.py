@@ -1,31 +1,39 @@
-from io import BytesIO
-
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import CustomPagination
+from api.autocomplete import search_ingredients
+from api.filters import RecipeFilter
+from api.pagination import (CustomPagination, FeedPagination, RecipePagination,
+                            SubscriptionPagination)
 from api.permissions import IsAuthorOrReadOnly
+from api.reference_data import ReferenceDataCache
+from api.renderers import (DEFAULT_SHOPPING_LIST_FORMAT,
+                           SHOPPING_LIST_RENDERERS, QueryFormatNegotiation)
+from api.representations import (INGREDIENT_FIELDS, TAG_FIELDS, USER_FIELDS,
+                                 get_subscribed_ids, get_user_row,
+                                 represent_user)
 from api.serializers import (AvatarSerializer, CustomUserSerializer,
                              IngredientSerializer, RecipeReadSerializer,
                              RecipeSerializer, RecipeWriteSerializer,
                              ShortLinkSerializer, SubscriptionSerializer,
                              TagSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, ShortLink, Tag)
+from api.shopping_list import export_shopping_list, get_shopping_list
+from recipes import feed
+from recipes.counters import change_counter
+from recipes.ingredient_index import get_ingredient_index
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShortLink, Tag)
+from recipes.similarity import get_similar_ids
 from users.models import CustomUser, Subscription
 
 User = get_user_model()
@@ -44,9 +52,22 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        user = request.user
-        serializer = self.get_serializer(user)
-        return Response(serializer.data)
+        return Response(represent_user(
+            get_user_row(request.user), request,
+            get_subscribed_ids(request.user)))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*USER_FIELDS))
+        subscribed_ids = get_subscribed_ids(request.user)
+        return self.get_paginated_response([
+            represent_user(row, request, subscribed_ids) for row in page
+        ])
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(represent_user(
+            get_user_row(self.get_object()), request,
+            get_subscribed_ids(request.user)))
 
     @action(
         detail=False,
@@ -58,7 +79,7 @@ class CustomUserViewSet(UserViewSet):
         user = request.user
 
         if request.method == 'DELETE':
-            user.avatar.delete()
+            # Файл может быть общим: его удалит collect_media_garbage.
             user.avatar = None
             user.save()
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -72,16 +93,35 @@ class CustomUserViewSet(UserViewSet):
         detail=False,
         methods=['get'],
         permission_classes=[IsAuthenticated],
-        pagination_class=CustomPagination
+        pagination_class=SubscriptionPagination
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribers__user=user)
+        context = self.get_subscription_context()
+        recipes = Recipe.objects.all()
+        if context['recipes_limit']:
+            recipes = recipes[:context['recipes_limit']]
+        queryset = User.objects.filter(
+            subscribers__user=user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
         page = self.paginate_queryset(queryset)
-        serializer = SubscriptionSerializer(page, many=True,
-                                            context={'request': request})
+        serializer = SubscriptionSerializer(page, many=True, context=context)
         return self.get_paginated_response(serializer.data)
 
+    def get_subscription_context(self):
+        """Контекст сериализатора подписок с разобранным recipes_limit."""
+        try:
+            recipes_limit = int(
+                self.request.query_params.get('recipes_limit', 0))
+        except ValueError:
+            recipes_limit = 0
+        return {
+            'request': self.request,
+            'recipes_limit': recipes_limit if recipes_limit > 0 else None
+        }
+
     @action(
         detail=True,
         methods=['post', 'delete'],
@@ -98,24 +138,31 @@ class CustomUserViewSet(UserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        authors = User.objects.filter(pk=author.pk)
         if request.method == 'POST':
-            subscription, created = Subscription.objects.get_or_create(
-                user=user, author=author
-            )
-            if not created:
-                return Response(
-                    {'errors': 'Вы уже подписаны на этого пользователя.'},
-                    status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                subscription, created = Subscription.objects.get_or_create(
+                    user=user, author=author
+                )
+                if not created:
+                    return Response(
+                        {'errors': 'Вы уже подписаны на этого пользователя.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+                change_counter(authors, 'subscribers_count', 1)
+                feed.backfill(user, author)
 
             serializer = SubscriptionSerializer(
-                author, context={'request': request}
+                author, context=self.get_subscription_context()
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        subscription = Subscription.objects.filter(
-            user=user, author=author).first()
-        if subscription:
-            subscription.delete()
+        with transaction.atomic():
+            deleted, _ = Subscription.objects.filter(
+                user=user, author=author).delete()
+            if deleted:
+                change_counter(authors, 'subscribers_count', -deleted)
+                feed.remove(user, author)
+        if deleted:
             return Response({'detail': 'Подписка отменена.'},
                             status=status.HTTP_204_NO_CONTENT)
 
@@ -128,31 +175,143 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
+    reference_data = ReferenceDataCache('tags', queryset, TAG_FIELDS)
+
+    def list(self, request, *args, **kwargs):
+        return self.reference_data.response(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(get_object_or_404(
+            self.queryset.values(*TAG_FIELDS), pk=kwargs['pk']))
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     pagination_class = None
+    reference_data = ReferenceDataCache(
+        'ingredients', queryset, INGREDIENT_FIELDS)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(search_ingredients(name))
+        return self.reference_data.response(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(get_object_or_404(
+            self.queryset.values(*INGREDIENT_FIELDS), pk=kwargs['pk']))
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        # Теги и ингредиенты подгружаются сериализатором только для
+        # рецептов, которых нет в кэше фрагментов.
+        queryset = Recipe.objects.select_related('author').with_user_flags(
+            self.request.user)
+        if self.request.query_params.get('ordering') == 'popular':
+            # Строка рейтинга есть у каждого рецепта, так что соединение
+            # внутреннее, а порядок совпадает с popularity_score_idx.
+            queryset = queryset.filter(popularity__isnull=False).order_by(
+                '-popularity__score', '-popularity__recipe_id')
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['thumbnails'] = self.action in ('list', 'feed', 'cook_with')
+        return context
+
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return RecipeWriteSerializer
         return RecipeReadSerializer
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            recipe = serializer.save(
+                author=self.request.user,
+                fanned_out=feed.is_fanout_author(self.request.user))
+            change_counter(
+                User.objects.filter(pk=self.request.user.pk),
+                'recipes_count', 1)
+            transaction.on_commit(lambda: feed.fan_out(recipe))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            change_counter(
+                User.objects.filter(pk=instance.author_id),
+                'recipes_count', -1)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='cook_with',
+        pagination_class=CustomPagination
+    )
+    def cook_with(self, request):
+        """Рецепты по доле ингредиентов, которые есть у пользователя."""
+        try:
+            ingredient_ids = {
+                int(value)
+                for values in request.query_params.getlist('ingredients')
+                for value in values.split(',') if value
+            }
+        except ValueError:
+            return Response({'errors': 'Неверный id ингредиента.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ingredient_ids:
+            return Response({'errors': 'Не указаны ингредиенты.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        ranked = get_ingredient_index().search(ingredient_ids)
+        page = self.paginate_queryset(ranked)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page])
+        page = [(recipes[recipe_id], coverage)
+                for recipe_id, coverage in page if recipe_id in recipes]
+        data = self.get_serializer(
+            [recipe for recipe, _ in page], many=True).data
+        for item, (_, coverage) in zip(data, page):
+            item['coverage'] = round(coverage, 3)
+        return self.get_paginated_response(data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие рецепты по заранее рассчитанной таблице."""
+        try:
+            similar_ids = get_similar_ids(int(pk))
+        except ValueError:
+            similar_ids = None
+        if similar_ids is None:
+            raise Http404
+        recipes = Recipe.objects.in_bulk(similar_ids)
+        serializer = RecipeSerializer(
+            [recipes[recipe_id] for recipe_id in similar_ids
+             if recipe_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
 
     @action(
         detail=True,
@@ -162,8 +321,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk):
         if request.method == 'POST':
-            return self.add_to(request.user, pk, Favorite)
-        return self.delete_from(request.user, pk, Favorite)
+            return self.add_to(request.user, pk, Favorite, 'favorites_count')
+        return self.delete_from(
+            request.user, pk, Favorite, 'favorites_count')
 
     @action(
         detail=True,
@@ -173,27 +333,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
-            return self.add_to(request.user, pk, ShoppingCart)
-        return self.delete_from(request.user, pk, ShoppingCart)
+            return self.add_to(
+                request.user, pk, ShoppingCart, 'in_carts_count')
+        return self.delete_from(
+            request.user, pk, ShoppingCart, 'in_carts_count')
 
-    def add_to(self, user, pk, model):
+    def add_to(self, user, pk, model, counter):
         """Добавление рецепта в коллекцию."""
         recipe = get_object_or_404(Recipe, pk=pk)
         if model.objects.filter(user=user, recipe=recipe).exists():
             return Response({'errors': 'Рецепт уже добавлен.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        model.objects.create(user=user, recipe=recipe)
+        with transaction.atomic():
+            model.objects.create(user=user, recipe=recipe)
+            change_counter(Recipe.objects.filter(pk=recipe.pk), counter, 1)
         serializer = RecipeSerializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete_from(self, user, pk, model):
+    def delete_from(self, user, pk, model, counter):
         """Удаление рецепта из коллекции."""
         recipe = get_object_or_404(Recipe, pk=pk)
-        collection = model.objects.filter(user=user, recipe=recipe)
-        if not collection.exists():
-            return Response({'errors': 'Рецепт отсутствует.'},
-                            status=status.HTTP_400_BAD_REQUEST)
-        collection.delete()
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(
+                user=user, recipe=recipe).delete()
+            if not deleted:
+                return Response({'errors': 'Рецепт отсутствует.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            change_counter(
+                Recipe.objects.filter(pk=recipe.pk), counter, -deleted)
         return Response({'status': 'Рецепт успешно удалён.'},
                         status=status.HTTP_204_NO_CONTENT)
 
@@ -223,42 +390,22 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['get'],
         permission_classes=[IsAuthenticated],
         url_path='download_shopping_cart',
+        content_negotiation_class=QueryFormatNegotiation
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        shopping_cart = ShoppingCart.objects.filter(user=user)
+        """Выгрузка списка покупок в формате из параметра format."""
+        renderer_class = SHOPPING_LIST_RENDERERS.get(
+            request.query_params.get('format', DEFAULT_SHOPPING_LIST_FORMAT))
+        if renderer_class is None:
+            return Response(
+                {'error': 'Доступные форматы: '
+                 + ', '.join(SHOPPING_LIST_RENDERERS) + '.'},
+                status=status.HTTP_400_BAD_REQUEST)
 
-        if not shopping_cart.exists():
+        ingredients = get_shopping_list(request.user)
+
+        if not ingredients:
             return Response({'error': 'Корзина пуста'},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=shopping_cart.values_list('recipe', flat=True)
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(total_amount=Sum('amount'))
-
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        pdfmetrics.registerFont(
-            TTFont('ArialMT', '/usr/share/fonts/truetype/arialmt.ttf'))
-
-        p.setFont('ArialMT', 12)
-        p.drawString(100, 750, "Список покупок:")
-
-        start_height = 700
-        for item in ingredients:
-            p.drawString(
-                100,
-                start_height,
-                f"{item['ingredient__name']} - {item['total_amount']} /"
-                f"{item['ingredient__measurement_unit']}"
-            )
-            start_height -= 20
-
-        p.showPage()
-        p.save()
-
-        buffer.seek(0)
-        return FileResponse(buffer, as_attachment=True,
-                            filename='shopping_cart.pdf')
+        return export_shopping_list(request, renderer_class(), ingredients)
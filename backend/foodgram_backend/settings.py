@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.utils import get_random_secret_key
 from dotenv import load_dotenv
 
@@ -69,7 +70,9 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
 
-if os.getenv('USE_SQLITE', 'False').lower() == 'true':
+USE_SQLITE = os.getenv('USE_SQLITE', 'False').lower() == 'true'
+
+if USE_SQLITE:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -89,6 +92,35 @@ else:
         }
     }
 
+# Именованные кэши: reference - справочники, версии данных и
+# неизменяемые записи, user - данные отдельных пользователей,
+# fragments - готовые документы и фрагменты ответов. Кэш в памяти
+# процесса допустим только для DEBUG и SQLite (разработка и тесты): с
+# несколькими процессами версии данных в нём расходятся и устаревают.
+CACHE_NAMES = ('default', 'reference', 'user', 'fragments')
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        name: {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': name,
+        }
+        for name in CACHE_NAMES
+    }
+elif DEBUG or USE_SQLITE:
+    CACHES = {
+        name: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': name,
+        }
+        for name in CACHE_NAMES
+    }
+else:
+    raise ImproperlyConfigured(
+        'Не задан REDIS_URL: процессам нужен общий кэш.')
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,6 +156,15 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = BASE_DIR / 'collected_static'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'recipes.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.CustomUser'
@@ -160,3 +201,10 @@ DJOSER = {
     },
 }
 DOMAIN_NAME = os.getenv('DOMAIN_NAME')
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', os.path.join(BASE_DIR, 'fonts', 'arialmt.ttf')
+)
+
+# 0 - миниатюры строятся синхронно, в потоке запроса.
+THUMBNAIL_WORKERS = int(os.getenv('THUMBNAIL_WORKERS', 2))
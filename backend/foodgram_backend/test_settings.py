@@ -0,0 +1,6 @@
+import os
+
+# Тесты идут на SQLite и кэше в памяти, без PostgreSQL и Redis.
+os.environ['USE_SQLITE'] = 'true'
+
+from foodgram_backend.settings import *  # noqa: E402,F401,F403
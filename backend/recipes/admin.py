@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.admin import display
 
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            RecipePopularity, ShoppingCart, Tag)
 
 
 @admin.register(Recipe)
@@ -10,19 +10,21 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'id',
         'name',
-        'author'
+        'author',
+        'added_in_favorites'
     )
     search_fields = (
-        'author',
+        'author__username',
         'name'
     )
     list_filter = (
         'tags',
     )
 
-    @display(description='Количество в избранных')
+    @display(description='Количество в избранных',
+             ordering='favorites_count')
     def added_in_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
@@ -67,3 +69,12 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user',
         'recipe'
     )
+
+
+@admin.register(RecipePopularity)
+class RecipePopularityAdmin(admin.ModelAdmin):
+    list_display = (
+        'recipe',
+        'score',
+        'updated_at'
+    )
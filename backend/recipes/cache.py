@@ -0,0 +1,115 @@
+import math
+import random
+import time
+
+from django.core.cache import caches
+
+# Именованные кэши из settings.CACHES.
+REFERENCE = 'reference'
+USER = 'user'
+FRAGMENTS = 'fragments'
+
+# Время, на которое берётся блокировка пересчёта значения.
+LOCK_TIMEOUT = 30
+# Сколько ждать значения, которое пересчитывает другой процесс.
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+# Чем больше, тем раньше до истечения срока начинается пересчёт.
+EARLY_EXPIRY_BETA = 1.0
+
+
+def get_cache(name):
+    return caches[name]
+
+
+def get_version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """Текущая версия набора данных.
+
+    Начальное значение берётся из текущего времени, поэтому после
+    вытеснения ключа из кэша версия не повторит одну из прежних.
+    """
+    cache = get_cache(REFERENCE)
+    key = get_version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Увеличивает версию, делая недействительными зависящие от неё
+    данные во всех процессах, использующих общий кэш."""
+    try:
+        return get_cache(REFERENCE).incr(get_version_key(name))
+    except ValueError:
+        return get_version(name)
+
+
+def should_recompute(entry):
+    """Вероятностное досрочное истечение: чем ближе срок и чем дольше
+    считается значение, тем вероятнее пересчёт до истечения."""
+    _, delta, expires = entry
+    if expires is None:
+        return False
+    return (time.time() - delta * EARLY_EXPIRY_BETA
+            * math.log(1 - random.random())) >= expires
+
+
+def compute_and_set(cache, key, compute, timeout):
+    started = time.time()
+    value = compute()
+    delta = time.time() - started
+    expires = None if timeout is None else time.time() + timeout
+    cache.set(key, (value, delta, expires), timeout)
+    return value
+
+
+def get_or_set(name, key, compute, timeout=None):
+    """Значение из кэша name или результат compute().
+
+    Значение пересчитывает только процесс, взявший блокировку, а
+    остальные отдают прежнее значение или ждут нового не дольше
+    LOCK_WAIT. Значения с timeout пересчитываются с вероятностью,
+    растущей к концу срока, поэтому записи не истекают все разом.
+    """
+    cache = get_cache(name)
+    entry = cache.get(key)
+    if entry is not None and not should_recompute(entry):
+        return entry[0]
+
+    lock = f'lock:{key}'
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock, 1, LOCK_TIMEOUT):
+        if entry is not None:
+            return entry[0]
+        if time.monotonic() >= deadline:
+            return compute_and_set(cache, key, compute, timeout)
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    try:
+        return compute_and_set(cache, key, compute, timeout)
+    finally:
+        cache.delete(lock)
+
+
+def get_many(name, keys):
+    """Значения найденных ключей без досрочного истечения."""
+    return {
+        key: entry[0]
+        for key, entry in get_cache(name).get_many(keys).items()
+    }
+
+
+def set_many(name, values, timeout=None):
+    expires = None if timeout is None else time.time() + timeout
+    get_cache(name).set_many(
+        {key: (value, 0, expires) for key, value in values.items()},
+        timeout
+    )
@@ -9,3 +9,6 @@ MAX_LENGTH_UNIT = 50
 MAX_LENGTH_TITLE = 255
 MAX_LENGTH_URL = 200
 MAX_LENGTH_LINK = 6
+SHORT_URL_ATTEMPTS = 10
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_PIXELS = 4096 * 4096
@@ -0,0 +1,35 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def related_count(model, field):
+    """Подзапрос с числом строк model, ссылающихся на объект по field."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+def reconcile_counter(queryset, counter, model, field):
+    """Исправляет счётчик там, где он разошёлся с реальным числом связей.
+
+    Возвращает количество исправленных строк.
+    """
+    return queryset.annotate(
+        actual=related_count(model, field)
+    ).exclude(
+        **{counter: F('actual')}
+    ).update(**{counter: related_count(model, field)})
+
+
+def change_counter(queryset, counter, delta):
+    """Атомарно изменяет счётчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{counter}__gte': -delta})
+    return queryset.update(**{counter: F(counter) + delta})
@@ -0,0 +1,87 @@
+from heapq import merge
+from itertools import islice
+
+from django.db.models import Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+# Рецепты авторов с большим числом подписчиков не рассылаются по лентам
+# при публикации и подмешиваются при чтении. Способ запоминается в
+# Recipe.fanned_out, поэтому смена числа подписчиков автора не теряет
+# уже опубликованные рецепты.
+FANOUT_SUBSCRIBERS_LIMIT = 10000
+FANOUT_BATCH_SIZE = 1000
+# Сколько последних рецептов автора попадает в ленту при подписке.
+BACKFILL_SIZE = 50
+
+
+def is_fanout_author(author):
+    """Рассылать ли по лентам рецепты, которые автор публикует сейчас."""
+    return author.subscribers_count <= FANOUT_SUBSCRIBERS_LIMIT
+
+
+def fan_out(recipe):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    if not recipe.fanned_out:
+        return 0
+    subscribers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True).iterator(
+        chunk_size=FANOUT_BATCH_SIZE)
+    created = 0
+    while batch := list(islice(subscribers, FANOUT_BATCH_SIZE)):
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe=recipe,
+                       pub_date=recipe.pub_date) for user_id in batch],
+            ignore_conflicts=True
+        )
+        created += len(batch)
+    return created
+
+
+def backfill(user, author):
+    """Добавляет в ленту последние разосланные рецепты автора после
+    подписки."""
+    recipes = Recipe.objects.filter(author=author, fanned_out=True).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[:BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user=user, recipe_id=recipe_id, pub_date=pub_date)
+         for recipe_id, pub_date in recipes],
+        ignore_conflicts=True
+    )
+
+
+def remove(user, author):
+    """Убирает из ленты рецепты автора после отписки."""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def before(position, date_field, id_field):
+    """Условие keyset-пагинации: строго после позиции (дата, id)."""
+    if position is None:
+        return Q()
+    pub_date, pk = position
+    return (Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__lt': pk}))
+
+
+def get_feed_page(user, position=None, limit=6):
+    """Позиции (дата, id) рецептов ленты, следующих за position.
+
+    Возвращает не более limit + 1 строк: лишняя означает, что есть
+    следующая страница. Записи из ленты пользователя сливаются с
+    рецептами подписок, которые не рассылались по лентам.
+    """
+    inbox = FeedEntry.objects.filter(
+        before(position, 'pub_date', 'recipe_id'), user=user
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id')[:limit + 1]
+    not_fanned_out = Recipe.objects.filter(
+        before(position, 'pub_date', 'id'),
+        fanned_out=False,
+        author__subscribers__user=user
+    ).order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id')[:limit + 1]
+    return list(islice(
+        merge(list(inbox), list(not_fanned_out), reverse=True), limit + 1))
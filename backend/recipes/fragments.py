@@ -0,0 +1,32 @@
+from django.db.models import F
+
+from recipes.cache import get_version
+from recipes.models import Recipe
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+# Справочники, при изменении которых устаревают все фрагменты.
+FRAGMENT_VERSIONS = ('tags', 'ingredients')
+
+
+def get_fragment_keys(recipes):
+    """Ключи кэша с не зависящей от пользователя частью рецептов.
+
+    Ключ содержит версию фрагмента из строки рецепта, поэтому запрос,
+    прочитавший рецепт до изменения, кэширует старые данные под старым
+    ключом, который больше никто не читает.
+    """
+    prefix = ':'.join(str(get_version(name)) for name in FRAGMENT_VERSIONS)
+    return {
+        recipe.pk: f'recipe:{prefix}:{recipe.pk}:{recipe.fragment_version}'
+        for recipe in recipes
+    }
+
+
+def bump_fragment_version(**filters):
+    """Делает недействительными фрагменты подходящих рецептов.
+
+    Вызывается после изменения данных рецепта, в той же транзакции.
+    """
+    Recipe.objects.filter(**filters).update(
+        fragment_version=F('fragment_version') + 1
+    )
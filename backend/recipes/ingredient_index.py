@@ -0,0 +1,149 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+
+from recipes.cache import REFERENCE, bump_version, get_cache, get_version
+from recipes.models import RecipeIngredient
+
+VERSION = 'recipe_ingredients'
+BATCH_SIZE = 10000
+# Журнал изменений в общем кэше: версия -> id изменённого рецепта.
+CHANGES_TIMEOUT = 60 * 60
+# При большем отставании индекс дешевле перечитать целиком.
+MAX_CHANGES = 1000
+
+
+class RankedMatches:
+    """Результат поиска: пары (id рецепта, покрытие) по убыванию
+    покрытия.
+
+    Совпадения не сортируются целиком: срез страницы берётся через
+    nlargest по его верхней границе, а len() не требует порядка.
+    """
+
+    def __init__(self, scored):
+        self.scored = scored
+
+    def __len__(self):
+        return len(self.scored)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[:][index]
+        start, stop, step = index.indices(len(self.scored))
+        ranked = nlargest(stop, self.scored) if step > 0 else sorted(
+            self.scored, reverse=True)
+        return [(recipe_id, coverage)
+                for coverage, _, recipe_id in ranked[start:stop:step]]
+
+
+class IngredientIndex:
+    """Инвертированный индекс ингредиентов в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта - кортеж его ингредиентов. Совпадения считаются
+    Counter по массивам выбранных ингредиентов, без обращения к БД.
+    """
+
+    def __init__(self, rows=()):
+        self.postings = {}
+        self.recipes = {}
+        recipes = {}
+        for recipe_id, ingredient_id in rows:
+            recipes.setdefault(recipe_id, set()).add(ingredient_id)
+        for recipe_id in sorted(recipes):
+            self.recipes[recipe_id] = tuple(recipes[recipe_id])
+            for ingredient_id in recipes[recipe_id]:
+                self.postings.setdefault(
+                    ingredient_id, array('q')).append(recipe_id)
+
+    def set_recipe(self, recipe_id, ingredient_ids):
+        """Заменяет состав рецепта; пустой состав удаляет рецепт."""
+        old = set(self.recipes.pop(recipe_id, ()))
+        new = set(ingredient_ids)
+        for ingredient_id in old - new:
+            postings = self.postings[ingredient_id]
+            del postings[bisect_left(postings, recipe_id)]
+        for ingredient_id in new - old:
+            insort(self.postings.setdefault(ingredient_id, array('q')),
+                   recipe_id)
+        if new:
+            self.recipes[recipe_id] = tuple(new)
+
+    def search(self, ingredient_ids):
+        """Пары (id рецепта, покрытие) по убыванию доли ингредиентов
+        рецепта, входящих в ingredient_ids."""
+        matches = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matches.update(self.postings.get(ingredient_id, ()))
+        return RankedMatches([
+            (matched / len(self.recipes[recipe_id]), matched, recipe_id)
+            for recipe_id, matched in matches.items()
+        ])
+
+
+_index = (None, None)
+
+
+def get_change_key(version):
+    return f'{VERSION}:change:{version}'
+
+
+def load_changes(loaded_version, version):
+    """id рецептов, изменённых после loaded_version, из журнала.
+
+    None, если журнал неполон и индекс нужно перечитать.
+    """
+    if not 0 < version - loaded_version <= MAX_CHANGES:
+        return None
+    keys = [get_change_key(number)
+            for number in range(loaded_version + 1, version + 1)]
+    changes = get_cache(REFERENCE).get_many(keys)
+    if len(changes) != len(keys):
+        return None
+    return set(changes.values())
+
+
+def apply_changes(index, recipe_ids):
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'ingredient_id'):
+        ingredients[recipe_id].append(ingredient_id)
+    for recipe_id, ingredient_ids in ingredients.items():
+        index.set_recipe(recipe_id, ingredient_ids)
+
+
+def get_ingredient_index():
+    """Индекс загружается при первом запросе и догоняет изменения
+    других процессов по журналу. Если журнал неполон, индекс
+    перечитывается целиком."""
+    global _index
+    version = get_version(VERSION)
+    loaded_version, index = _index
+    if loaded_version == version:
+        return index
+    changes = None if index is None else load_changes(
+        loaded_version, version)
+    if changes is None:
+        index = IngredientIndex(
+            RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            ).iterator(chunk_size=BATCH_SIZE)
+        )
+    else:
+        apply_changes(index, changes)
+    _index = (version, index)
+    return index
+
+
+def update_recipe(recipe_id):
+    """Записывает изменение состава рецепта в журнал.
+
+    Все процессы, включая текущий, применят его к своему индексу при
+    следующем запросе.
+    """
+    version = bump_version(VERSION)
+    get_cache(REFERENCE).set(
+        get_change_key(version), recipe_id, CHANGES_TIMEOUT)
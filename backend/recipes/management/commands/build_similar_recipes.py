@@ -0,0 +1,34 @@
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.similarity import TOP_K, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт похожих рецептов по ингредиентам и тегам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=TOP_K,
+            help='Количество похожих рецептов для каждого рецепта'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Повторять пересчёт каждые N секунд'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            updated = rebuild(options['top_k'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Обработано рецептов: {updated} '
+                f'за {time.monotonic() - started:.2f} с'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand
+from django.db.models import F
+
+from recipes.models import Recipe
+from recipes.thumbnails import make_thumbnails
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Построение миниатюр изображений рецептов, у которых их нет'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(
+            thumbnail_source=F('image')
+        ).values_list('id', 'image')
+        built = failed = 0
+        for recipe_id, name in recipes.iterator(chunk_size=BATCH_SIZE):
+            try:
+                make_thumbnails(recipe_id, name)
+            except OSError as error:
+                self.stderr.write(f'{name}: {error}')
+                failed += 1
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Построено миниатюр: {built}, ошибок: {failed}'))
@@ -0,0 +1,111 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.thumbnails import (THUMBNAIL_DIR, get_thumbnail_names,
+                                thumbnail_storage)
+
+User = get_user_model()
+
+BATCH_SIZE = 10000
+GRACE_PERIOD = 24 * 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Удаление файлов медиа, на которые не ссылаются рецепты и аватары'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать файлы, которые будут удалены'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=GRACE_PERIOD,
+            help='Не трогать файлы моложе N секунд'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк, читаемых из БД за раз'
+        )
+
+    def count_references(self, batch_size):
+        """Число ссылок на каждый файл из полей изображений."""
+        references = Counter()
+        for model, field in ((Recipe, 'image'), (User, 'avatar')):
+            names = model.objects.exclude(**{field: ''}).exclude(
+                **{f'{field}__isnull': True}
+            ).values_list(field, flat=True)
+            references.update(names.iterator(chunk_size=batch_size))
+        return references
+
+    def list_files(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for name in directories:
+            yield from self.list_files(storage, os.path.join(directory, name))
+
+    def is_referenced(self, name):
+        """Есть ли ссылка на файл в БД прямо сейчас."""
+        return (Recipe.objects.filter(image=name).exists()
+                or User.objects.filter(avatar=name).exists())
+
+    def is_thumbnail_referenced(self, name):
+        source = os.path.basename(name).rsplit('_', 1)[0]
+        return self.is_referenced(Recipe.image.field.upload_to + source)
+
+    def sweep(self, storage, directory, referenced, is_referenced,
+              deadline, dry_run):
+        removed = 0
+        for name in self.list_files(storage, directory):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > deadline:
+                continue
+            # Ссылка или повторная загрузка того же содержимого могли
+            # появиться после того, как были собраны ссылки.
+            if (is_referenced(name)
+                    or storage.get_modified_time(name) > deadline):
+                continue
+            self.stdout.write(f'Удаление {name}')
+            if not dry_run:
+                storage.delete(name)
+            removed += 1
+        return removed
+
+    def handle(self, *args, **options):
+        deadline = timezone.now() - timedelta(seconds=options['grace'])
+        references = self.count_references(options['batch_size'])
+        thumbnails = {
+            thumbnail
+            for name in references
+            if name.startswith(Recipe.image.field.upload_to)
+            for thumbnail in get_thumbnail_names(name)
+        }
+        removed = 0
+        for directory in (Recipe.image.field.upload_to,
+                          User.avatar.field.upload_to):
+            removed += self.sweep(
+                default_storage, directory.rstrip('/'), references,
+                self.is_referenced, deadline, options['dry_run'])
+        removed += self.sweep(
+            thumbnail_storage, THUMBNAIL_DIR, thumbnails,
+            self.is_thumbnail_referenced, deadline, options['dry_run'])
+        shared = sum(1 for count in references.values() if count > 1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов по ссылкам: {len(references)}, '
+            f'из них общих: {shared}. Удалено файлов: {removed}'
+        ))
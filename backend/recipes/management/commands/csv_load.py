@@ -1,37 +1,190 @@
 import csv
+import json
+import os
+import re
+import time
+from io import StringIO
+from itertools import islice
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
 
+from recipes.cache import bump_version
 from recipes.models import Ingredient, Tag
 
 PATH_SRC = 'static/data/'
+BATCH_SIZE = 10000
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_SPACE = re.compile(r'\s*')
 
 src = (
-    (f'{PATH_SRC}ingredients.csv', Ingredient, ['name', 'measurement_unit']),
-    (f'{PATH_SRC}tags.csv', Tag, ['name', 'slug']),
+    ('ingredients.csv', Ingredient, ['name', 'measurement_unit'],
+     'ingredients'),
+    ('ingredients.json', Ingredient, ['name', 'measurement_unit'],
+     'ingredients'),
+    ('tags.csv', Tag, ['name', 'slug'], 'tags'),
 )
 
 
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """Элементы JSON-массива по одному, без чтения файла целиком.
+
+    В памяти держится только непрочитанный остаток очередного куска.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+    expected = '['
+    while True:
+        chunk = file.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            position = JSON_SPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if expected == '[':
+                if char != '[':
+                    raise ValueError('ожидался массив JSON')
+                position += 1
+                expected = 'item'
+            elif char == ']' and expected != 'next':
+                return
+            elif expected == ',':
+                if char not in ',]':
+                    raise ValueError(
+                        f'неожиданный символ {char!r} в массиве JSON')
+                if char == ']':
+                    return
+                position += 1
+                expected = 'next'
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break
+                if end == len(buffer) and chunk:
+                    # Число на границе куска могло прочитаться не целиком.
+                    break
+                yield item
+                position = end
+                expected = ','
+        if not chunk:
+            raise ValueError('массив JSON не завершён')
+
+
+def read_rows(filename, fields):
+    """Построчно читает файл csv или json в кортежи значений полей."""
+    with open(filename, 'r', encoding='utf-8') as file:
+        if filename.endswith('.json'):
+            for item in iter_json_array(file):
+                yield tuple(item[field] for field in fields)
+            return
+        for line, row in enumerate(csv.reader(file), start=1):
+            if len(row) != len(fields):
+                raise CommandError(
+                    f'{filename}, строка {line}: ожидалось '
+                    f'{len(fields)} значения, получено {len(row)}')
+            yield tuple(row)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
 class Command(BaseCommand):
-    help = 'Загрузка данных из файла csv в базу данных'
+    help = 'Загрузка данных из файлов csv и json в базу данных'
 
-    def import_csv(self, filename, model, fields):
-        try:
-            with open(filename, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                db_objects = []
-                for row in reader:
-                    args = {fields[i]: row[i] for i in range(len(fields))}
-                    db_objects.append(model(**args))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=PATH_SRC,
+            help='Каталог с файлами данных'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одной пачке'
+        )
+
+    def report(self, filename, processed, started, style=None):
+        rate = processed / max(time.monotonic() - started, 1e-6)
+        message = f'{filename}: {processed} строк, {rate:.0f} строк/с'
+        self.stdout.write(style(message) if style else message)
+
+    def copy_rows(self, filename, model, fields, batch_size):
+        """PostgreSQL: COPY во временную таблицу и один
+        INSERT ... ON CONFLICT DO NOTHING в основную."""
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        columns = ', '.join(quote(field) for field in fields)
+        staging = quote(f'{model._meta.db_table}_staging')
+        processed = 0
+        started = time.monotonic()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            for batch in batches(read_rows(filename, fields), batch_size):
+                buffer = StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {staging} ({columns}) FROM STDIN WITH CSV',
+                    buffer
+                )
+                processed += len(batch)
+                if self.verbosity > 1:
+                    self.report(filename, processed, started)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT DISTINCT {columns} FROM {staging} '
+                f'ON CONFLICT DO NOTHING'
+            )
+        return processed
+
+    def create_rows(self, filename, model, fields, batch_size):
+        """Остальные СУБД: bulk_create пачками с пропуском дубликатов."""
+        processed = 0
+        started = time.monotonic()
+        with transaction.atomic():
+            for batch in batches(read_rows(filename, fields), batch_size):
                 model.objects.bulk_create(
-                    db_objects,
+                    [model(**dict(zip(fields, row))) for row in batch],
                     ignore_conflicts=True
                 )
-                self.stdout.write(self.style.SUCCESS(f'{filename} обработан'))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(
-                f'Ошибка при загрузке {filename}: {e}'))
-
-    def handle(self, *args, **kwargs):
-        for filename, model, fields in src:
-            self.import_csv(filename, model, fields)
+                processed += len(batch)
+                if self.verbosity > 1:
+                    self.report(filename, processed, started)
+        return processed
+
+    def import_file(self, filename, model, fields, batch_size):
+        if connection.vendor == 'postgresql':
+            load = self.copy_rows
+        else:
+            load = self.create_rows
+        started = time.monotonic()
+        before = model.objects.count()
+        try:
+            processed = load(filename, model, fields, batch_size)
+        except (OSError, ValueError, KeyError, DatabaseError) as error:
+            raise CommandError(
+                f'Ошибка при загрузке {filename}: {error}') from error
+        self.report(filename, processed, started, self.style.SUCCESS)
+        self.stdout.write(
+            f'Добавлено записей: {model.objects.count() - before}')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        for filename, model, fields, version in src:
+            self.import_file(
+                os.path.join(options['path'], filename),
+                model, fields, options['batch_size']
+            )
+            bump_version(version)
@@ -0,0 +1,76 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+FEED_LIMIT = 6
+# PostgreSQL: "Seq Scan"; SQLite: "SCAN <таблица>" без "USING INDEX".
+SEQ_SCAN = re.compile(r'Seq Scan|\bSCAN \S+\s*$', re.MULTILINE)
+
+
+class Command(BaseCommand):
+    help = 'Планы выполнения основных запросов ленты рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя для фильтров избранного и корзины'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Выполнить EXPLAIN ANALYZE (только PostgreSQL)'
+        )
+        parser.add_argument(
+            '--fail-on-seq-scan',
+            action='store_true',
+            help='Завершиться с ошибкой, если найдено полное сканирование'
+        )
+
+    def get_queries(self, user):
+        recipes = Recipe.objects.with_user_flags(user)
+        tag = Tag.objects.first()
+        queries = {
+            'Лента': recipes,
+            'Автор': recipes.filter(author=user),
+            'Избранное': recipes.filter(favorited_by__user=user),
+            'Корзина': recipes.filter(shopping_cart__user=user),
+        }
+        if tag:
+            queries['Тег'] = recipes.filter(tags__slug=tag.slug).distinct()
+        return {
+            name: queryset[:FEED_LIMIT]
+            for name, queryset in queries.items()
+        }
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(pk=options['user']).first()
+        else:
+            user = User.objects.first()
+        if user is None:
+            raise CommandError('Нет пользователя для построения запросов.')
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        seq_scans = []
+        for name, queryset in self.get_queries(user).items():
+            plan = queryset.explain(**explain_options)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            if SEQ_SCAN.search(plan):
+                seq_scans.append(name)
+                self.stdout.write(self.style.WARNING(
+                    'Найдено полное сканирование таблицы'))
+
+        if seq_scans and options['fail_on_seq_scan']:
+            raise CommandError(
+                'Полное сканирование в запросах: ' + ', '.join(seq_scans))
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from recipes.counters import reconcile_counter
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+counters = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт денормализованных счётчиков рецептов и пользователей'
+
+    def handle(self, *args, **options):
+        for model, counter, related_model, field in counters:
+            fixed = reconcile_counter(
+                model.objects.all(), counter, related_model, field)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.model_name}.{counter}: '
+                f'исправлено записей {fixed}'
+            ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management import BaseCommand
+
+from recipes.popularity import rebuild, refresh
+
+
+class Command(BaseCommand):
+    help = 'Обновление таблицы популярности рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рейтинг полностью'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Повторять обновление каждые N секунд'
+        )
+
+    def handle(self, *args, **options):
+        update = rebuild if options['full'] else refresh
+        while True:
+            started = time.monotonic()
+            updated = update()
+            self.stdout.write(self.style.SUCCESS(
+                f'Обновлено рецептов: {updated} '
+                f'за {time.monotonic() - started:.2f} с'
+            ))
+            if not options['interval']:
+                break
+            update = refresh
+            time.sleep(options['interval'])
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.14 on 2026-10-18 02:54
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Оставляет по одному ингредиенту на пару (name, measurement_unit),
+    перенося на него ссылки из рецептов."""
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep_id=Min('id'), total=Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        extra_ids = list(Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(id=duplicate['keep_id']).values_list('id', flat=True))
+        for item in RecipeIngredient.objects.filter(
+                ingredient_id__in=extra_ids):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=item.recipe_id,
+                ingredient_id=duplicate['keep_id']
+            ).first()
+            if kept:
+                kept.amount += item.amount
+                kept.save(update_fields=['amount'])
+                item.delete()
+            else:
+                item.ingredient_id = duplicate['keep_id']
+                item.save(update_fields=['ingredient'])
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_ingredient_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shortlink',
+            name='original_url',
+            field=models.URLField(db_index=True),
+        ),
+    ]
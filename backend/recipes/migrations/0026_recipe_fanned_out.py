@@ -0,0 +1,62 @@
+# Generated by Django 4.2.14 on 2026-10-18 03:25
+
+from itertools import islice
+
+from django.db import migrations, models
+
+# Значения recipes.feed на момент миграции.
+FANOUT_SUBSCRIBERS_LIMIT = 10000
+BACKFILL_SIZE = 50
+BATCH_SIZE = 1000
+
+
+def backfill_feeds(apps, schema_editor):
+    """Отмечает рецепты авторов, которым лента не рассылается, и
+    заполняет ленты существующих подписок последними рецептами
+    остальных авторов."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipe.objects.filter(
+        author__subscribers_count__gt=FANOUT_SUBSCRIBERS_LIMIT
+    ).update(fanned_out=False)
+    author_ids = list(Subscription.objects.filter(
+        author__subscribers_count__lte=FANOUT_SUBSCRIBERS_LIMIT
+    ).order_by().values_list('author_id', flat=True).distinct())
+    for author_id in author_ids:
+        recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id').values_list('id', 'pub_date')[:BACKFILL_SIZE])
+        if not recipes:
+            continue
+        subscribers = Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator(chunk_size=BATCH_SIZE)
+        while batch := list(islice(subscribers, BATCH_SIZE)):
+            FeedEntry.objects.bulk_create(
+                [FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                           pub_date=pub_date)
+                 for user_id in batch
+                 for recipe_id, pub_date in recipes],
+                ignore_conflicts=True
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0025_recipe_thumbnail_source'),
+        ('users', '0008_customuser_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Разослан по лентам подписчиков'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-pub_date', '-id'], name='recipe_not_fanned_out_idx'),
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.14 on 2026-10-18 03:27
+
+from django.db import migrations
+
+
+def reset_thumbnail_source(apps, schema_editor):
+    """Миниатюры прежнего формата имён не используются: списки берут
+    исходное изображение, пока build_thumbnails не построит новые."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.exclude(thumbnail_source='').update(thumbnail_source='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0026_recipe_fanned_out'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_thumbnail_source,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0027_reset_thumbnail_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fragment_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия кэшированного представления'),
+        ),
+    ]
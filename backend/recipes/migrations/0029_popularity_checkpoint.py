@@ -0,0 +1,29 @@
+# Generated by Django 4.2.14 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0028_recipe_fragment_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('settled_until', models.DateTimeField(verbose_name='События зафиксированы до')),
+            ],
+            options={
+                'verbose_name': 'Отметка пересчёта популярности',
+                'verbose_name_plural': 'Отметки пересчёта популярности',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipepopularity',
+            name='settled_score',
+            field=models.FloatField(default=0, verbose_name='Зафиксированная часть рейтинга'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.14 on 2026-10-18 03:45
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+BATCH_SIZE = 1000
+
+
+def create_missing_rows(apps, schema_editor):
+    """Создаёт нулевую строку рейтинга для рецептов без неё."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipePopularity = apps.get_model('recipes', 'RecipePopularity')
+    now = timezone.now()
+    RecipePopularity.objects.bulk_create(
+        (RecipePopularity(recipe_id=recipe_id, updated_at=now)
+         for recipe_id in Recipe.objects.filter(
+             popularity__isnull=True).values_list(
+             'pk', flat=True).iterator(chunk_size=BATCH_SIZE)),
+        batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0029_popularity_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recipepopularity',
+            name='popularity_score_idx',
+        ),
+        migrations.AlterField(
+            model_name='recipepopularity',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Обновлено'),
+        ),
+        migrations.AddIndex(
+            model_name='recipepopularity',
+            index=models.Index(fields=['-score', '-recipe'], name='popularity_score_idx'),
+        ),
+        migrations.RunPython(create_missing_rows, migrations.RunPython.noop),
+    ]
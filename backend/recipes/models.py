@@ -2,13 +2,16 @@ import random
 import string
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils import timezone
 
 from foodgram_backend import settings
 from recipes.config import (MAX_LENGTH_LINK, MAX_LENGTH_NAME, MAX_LENGTH_TAG,
                             MAX_LENGTH_TEXT, MAX_LENGTH_TITLE, MAX_LENGTH_UNIT,
-                            MAX_LENGTH_URL)
+                            MAX_LENGTH_URL, SHORT_URL_ATTEMPTS)
 
 User = get_user_model()
 
@@ -48,11 +51,46 @@ class Ingredient(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.measurement_unit})'
 
 
+def get_recipe_prefetches():
+    """Связи рецепта, нужные для полного представления: теги и
+    ингредиенты."""
+    return (
+        'tags',
+        Prefetch(
+            'recipes',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        )
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        """Аннотирует признаки избранного и корзины для пользователя."""
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -96,11 +134,60 @@ class Recipe(models.Model):
         blank=True,
         null=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество в избранном',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Количество в корзинах',
+        default=0,
+        editable=False
+    )
+    thumbnail_source = models.CharField(
+        'Изображение с готовыми миниатюрами',
+        max_length=100,
+        blank=True,
+        default='',
+        editable=False
+    )
+    fragment_version = models.PositiveIntegerField(
+        'Версия кэшированного представления',
+        default=0,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разослан по лентам подписчиков',
+        default=True,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                condition=models.Q(fanned_out=False),
+                name='recipe_not_fanned_out_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name[:MAX_LENGTH_TEXT]
@@ -152,12 +239,23 @@ class Favorite(models.Model):
         related_name='favorited_by',
         verbose_name='Избранный рецепт',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['user', 'recipe'],
                                     name='unique_favorite')
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='favorite_recipe_user_idx'
+            ),
+        ]
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
 
@@ -178,6 +276,11 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Корзина'
@@ -188,14 +291,143 @@ class ShoppingCart(models.Model):
                 name='unique_user_recipe_in_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'],
+                name='cart_recipe_user_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} добавил в корзину {self.recipe.name}'
 
 
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(
+        'Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} в ленте {self.user_id}'
+
+
+class RecipePopularity(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        'Рейтинг',
+        default=0
+    )
+    settled_score = models.FloatField(
+        'Зафиксированная часть рейтинга',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        'Обновлено',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        # Порядок индекса совпадает с ?ordering=popular: страница
+        # читается из индекса без сортировки всей таблицы.
+        indexes = [
+            models.Index(fields=['-score', '-recipe'],
+                         name='popularity_score_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.score}'
+
+
+class PopularityCheckpoint(models.Model):
+    settled_until = models.DateTimeField(
+        'События зафиксированы до'
+    )
+
+    class Meta:
+        verbose_name = 'Отметка пересчёта популярности'
+        verbose_name_plural = 'Отметки пересчёта популярности'
+
+    def __str__(self):
+        return f'События зафиксированы до {self.settled_until}'
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(
+        'Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.similar_id} похож на {self.recipe_id}'
+
+
 class ShortLink(models.Model):
     original_url = models.URLField(
-        max_length=MAX_LENGTH_URL
+        max_length=MAX_LENGTH_URL,
+        db_index=True
     )
     short_url = models.CharField(
         max_length=MAX_LENGTH_LINK,
@@ -204,9 +436,16 @@ class ShortLink(models.Model):
     )
 
     def save(self, *args, **kwargs):
-        if not self.short_url:
+        if self.short_url:
+            return super().save(*args, **kwargs)
+        for attempt in range(SHORT_URL_ATTEMPTS):
             self.short_url = self.generate_short_url()
-        super().save(*args, **kwargs)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SHORT_URL_ATTEMPTS - 1:
+                    raise
 
     def generate_short_url(self):
         length = 6
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from recipes.models import (Favorite, PopularityCheckpoint, Recipe,
+                            RecipePopularity, ShoppingCart)
+
+# Вклад события в рейтинг уменьшается вдвое за HALF_LIFE. Чтобы не
+# пересчитывать затухание всех строк, вклад хранится относительно
+# фиксированной EPOCH: 2 ** ((t - EPOCH) / HALF_LIFE). Общий множитель
+# одинаков для всех рецептов и не влияет на порядок, поэтому новые
+# события просто прибавляются к рейтингу. При HALF_LIFE в неделю
+# значения остаются в пределах float примерно 19 лет от EPOCH.
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(days=7)
+WEIGHTS = (
+    (Favorite, 2.0),
+    (ShoppingCart, 1.0),
+)
+BATCH_SIZE = 1000
+# created ставится до коммита, поэтому событие с created раньше прошлого
+# обновления может стать видно уже после него. Вклад событий моложе
+# SAFETY_WINDOW не фиксируется, а пересчитывается при каждом обновлении.
+SAFETY_WINDOW = timedelta(minutes=15)
+
+
+def activity_score(created, weight):
+    return weight * 2 ** ((created - EPOCH) / HALF_LIFE)
+
+
+def collect_scores(since=None, until=None):
+    """Суммирует вклад добавлений в избранное и корзины по рецептам."""
+    scores = defaultdict(float)
+    for model, weight in WEIGHTS:
+        activity = model.objects.all()
+        if since is not None:
+            activity = activity.filter(created__gt=since)
+        if until is not None:
+            activity = activity.filter(created__lte=until)
+        for recipe_id, created in activity.values_list(
+                'recipe_id', 'created').iterator(chunk_size=BATCH_SIZE):
+            scores[recipe_id] += activity_score(created, weight)
+    return scores
+
+
+def apply_scores(settled, recent, now):
+    """Добавляет settled к зафиксированной части рейтинга.
+
+    Незафиксированная часть заменяется на recent целиком, поэтому
+    повторный учёт событий из окна ничего не удваивает.
+    """
+    recipe_ids = set(settled) | set(recent)
+    recipe_ids.update(RecipePopularity.objects.exclude(
+        score=F('settled_score')).values_list('recipe_id', flat=True))
+    existing = RecipePopularity.objects.select_for_update().in_bulk(
+        list(recipe_ids))
+    for recipe_id, popularity in existing.items():
+        popularity.settled_score += settled.get(recipe_id, 0)
+        popularity.score = (popularity.settled_score
+                            + recent.get(recipe_id, 0))
+        popularity.updated_at = now
+    RecipePopularity.objects.bulk_update(
+        existing.values(), ['score', 'settled_score', 'updated_at'],
+        batch_size=BATCH_SIZE
+    )
+    return len(existing)
+
+
+def rebuild():
+    """Полный пересчёт таблицы рейтинга, в том числе с учётом удалений."""
+    now = timezone.now()
+    settled_until = now - SAFETY_WINDOW
+    with transaction.atomic():
+        PopularityCheckpoint.objects.select_for_update().first()
+        # Строки обнуляются, а не удаляются: у каждого рецепта должна
+        # оставаться строка рейтинга. Заодно создаются пропущенные,
+        # например у рецептов, добавленных через bulk_create.
+        RecipePopularity.objects.bulk_create(
+            (RecipePopularity(recipe_id=recipe_id, updated_at=now)
+             for recipe_id in Recipe.objects.filter(
+                 popularity__isnull=True).values_list(
+                 'pk', flat=True).iterator(chunk_size=BATCH_SIZE)),
+            batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+        RecipePopularity.objects.update(
+            score=0, settled_score=0, updated_at=now)
+        updated = apply_scores(
+            collect_scores(until=settled_until),
+            collect_scores(since=settled_until, until=now),
+            now
+        )
+        PopularityCheckpoint.objects.update_or_create(
+            pk=1, defaults={'settled_until': settled_until})
+    return updated
+
+
+def refresh():
+    """Добавляет вклад событий, появившихся после прошлого обновления.
+
+    Удаления из избранного и корзины учитываются только rebuild().
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        checkpoint = PopularityCheckpoint.objects.select_for_update().first()
+        if checkpoint is None:
+            return rebuild()
+        settled_until = max(checkpoint.settled_until, now - SAFETY_WINDOW)
+        updated = apply_scores(
+            collect_scores(since=checkpoint.settled_until,
+                           until=settled_until),
+            collect_scores(since=settled_until, until=now),
+            now
+        )
+        checkpoint.settled_until = settled_until
+        checkpoint.save(update_fields=['settled_until'])
+    return updated
@@ -0,0 +1,75 @@
+import re
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from recipes.models import Recipe
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+# Веса bm25 для столбцов name и text, как веса A и B в PostgreSQL.
+FTS_WEIGHTS = (10.0, 1.0)
+WORD = re.compile(r'\w+')
+
+
+def get_search_vector():
+    return (SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=SEARCH_CONFIG))
+
+
+def update_search_index(recipe):
+    """Обновляет поисковый вектор (PostgreSQL) или строку FTS5 (SQLite)."""
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(pk=recipe.pk).update(
+            search_vector=get_search_vector())
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                f'VALUES (%s, %s, %s)',
+                [recipe.pk, recipe.name, recipe.text]
+            )
+
+
+def remove_from_search_index(recipe):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [recipe.pk])
+
+
+def get_fts_query(query):
+    """Запрос FTS5: все слова, каждое по префиксу.
+
+    В FTS5 нет русского стемминга, префикс частично его заменяет.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под query, по убыванию релевантности."""
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-pub_date', '-id')
+    if connection.vendor == 'sqlite':
+        match = get_fts_query(query)
+        if not match:
+            return queryset.none()
+        table = connection.ops.quote_name(Recipe._meta.db_table)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )).annotate(rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}."id"',
+            [*FTS_WEIGHTS, match]
+        )).order_by('-rank', '-pub_date', '-id')
+    return queryset.filter(Q(name__icontains=query) | Q(text__icontains=query))
@@ -0,0 +1,113 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from recipes.cache import bump_version
+from recipes.fragments import bump_fragment_version
+from recipes.ingredient_index import update_recipe
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipePopularity, ShoppingCart, Tag)
+from recipes.search import remove_from_search_index, update_search_index
+from recipes.similarity import VERSION as SIMILAR_RECIPES
+from recipes.thumbnails import schedule_thumbnails
+
+User = get_user_model()
+
+# Отправляется при изменении состава ингредиентов рецепта,
+# в том числе после bulk_create, который не вызывает post_save.
+recipe_ingredients_changed = Signal()
+
+
+def bump_shopping_cart_version(**filters):
+    """Сбрасывает кэш списка покупок у подходящих пользователей."""
+    User.objects.filter(**filters).update(
+        shopping_cart_version=F('shopping_cart_version') + 1
+    )
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    bump_shopping_cart_version(pk=instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipe_ingredients_changed.send(
+        sender=RecipeIngredient, recipe_id=instance.recipe_id)
+
+
+@receiver(recipe_ingredients_changed)
+def recipe_in_carts_changed(sender, recipe_id, **kwargs):
+    bump_shopping_cart_version(shopping_cart__recipe_id=recipe_id)
+
+
+@receiver(recipe_ingredients_changed)
+def recipe_in_index_changed(sender, recipe_id, **kwargs):
+    transaction.on_commit(partial(update_recipe, recipe_id))
+
+
+@receiver(recipe_ingredients_changed)
+def recipe_fragment_ingredients_changed(sender, recipe_id, **kwargs):
+    bump_fragment_version(pk=recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        bump_fragment_version(pk=instance.pk)
+    elif pk_set:
+        bump_fragment_version(pk__in=pk_set)
+    else:
+        bump_version('tags')
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        bump_shopping_cart_version(
+            shopping_cart__recipe__recipes__ingredient=instance)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, **kwargs):
+    bump_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    bump_version('ingredients')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    update_search_index(instance)
+    bump_fragment_version(pk=instance.pk)
+    if instance.image and instance.image.name != instance.thumbnail_source:
+        schedule_thumbnails(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    # Строка рейтинга есть у каждого рецепта: ?ordering=popular
+    # соединяет таблицы через INNER JOIN.
+    if created:
+        RecipePopularity.objects.create(recipe=instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    remove_from_search_index(instance)
+    bump_version(SIMILAR_RECIPES)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(['last_login']):
+        return
+    bump_fragment_version(author=instance)
@@ -0,0 +1,115 @@
+from array import array
+from collections import Counter
+from heapq import nlargest
+from itertools import islice
+
+from django.db import transaction
+
+from recipes.cache import REFERENCE, bump_version, get_or_set, get_version
+from recipes.models import Recipe, RecipeIngredient, SimilarRecipe
+
+VERSION = 'similar_recipes'
+TOP_K = 10
+BATCH_SIZE = 10000
+# Признак из столбца длиннее COMMON_FEATURE_LIMIT не порождает
+# кандидатов, а кандидатов на рецепт не больше MAX_CANDIDATES.
+COMMON_FEATURE_LIMIT = 1000
+MAX_CANDIDATES = 2000
+# Ключи привязаны к версии, которая меняется при каждом пересчёте и
+# удалении рецепта. Срок не даёт ключам старых версий копиться в кэше и
+# не короче обычного интервала пересчёта.
+CACHE_TIMEOUT = 60 * 60
+
+
+def load_features():
+    """Признаки рецептов: id ингредиентов и id тегов со знаком минус,
+    чтобы они не совпадали с ингредиентами."""
+    features = {}
+    rows = (
+        RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id'),
+        Recipe.tags.through.objects.values_list('recipe_id', 'tag_id'),
+    )
+    for sign, queryset in zip((1, -1), rows):
+        for recipe_id, feature in queryset.iterator(chunk_size=BATCH_SIZE):
+            features.setdefault(recipe_id, set()).add(sign * feature)
+    return features
+
+
+def build_postings(features):
+    """Разреженная матрица рецепт x признак по столбцам:
+    признак -> отсортированный массив id рецептов."""
+    postings = {}
+    for recipe_id in sorted(features):
+        for feature in features[recipe_id]:
+            postings.setdefault(feature, array('q')).append(recipe_id)
+    return postings
+
+
+def jaccard(first, second):
+    common = len(first & second)
+    return common / (len(first) + len(second) - common)
+
+
+def nearest(recipe_id, features, postings, top_k=TOP_K):
+    """top_k пар (сходство Жаккара, id рецепта) для рецепта.
+
+    Кандидаты набираются по столбцам редких признаков; столбцы общих
+    признаков (теги, соль) покрывают почти все рецепты и сделали бы
+    пересчёт квадратичным. Общие признаки учитываются в точном
+    сходстве кандидатов, а если кандидатов мало, они добираются из
+    самого короткого столбца признаков рецепта.
+    """
+    own = features[recipe_id]
+    shared = Counter()
+    for feature in own:
+        if len(postings[feature]) <= COMMON_FEATURE_LIMIT:
+            shared.update(postings[feature])
+    del shared[recipe_id]
+    candidates = [other for other, _ in shared.most_common(MAX_CANDIDATES)]
+    if len(candidates) < top_k:
+        shortest = min((postings[feature] for feature in own), key=len)
+        candidates.extend(islice(
+            (other for other in reversed(shortest)
+             if other != recipe_id and other not in shared),
+            MAX_CANDIDATES
+        ))
+    return nlargest(top_k, (
+        (jaccard(own, features[other]), other) for other in candidates
+    ))
+
+
+def rebuild(top_k=TOP_K):
+    """Пересчитывает таблицу похожих рецептов целиком."""
+    features = load_features()
+    postings = build_postings(features)
+    with transaction.atomic():
+        SimilarRecipe.objects.all().delete()
+        SimilarRecipe.objects.bulk_create(
+            (SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                           score=score)
+             for recipe_id in features
+             for score, similar_id in nearest(
+                 recipe_id, features, postings, top_k)),
+            batch_size=BATCH_SIZE
+        )
+    bump_version(VERSION)
+    return len(features)
+
+
+def get_similar_ids(recipe_id):
+    """id похожих рецептов по убыванию сходства из кэша.
+
+    None, если рецепта нет.
+    """
+    similar_ids = get_or_set(
+        REFERENCE,
+        f'similar_recipes:{get_version(VERSION)}:{recipe_id}',
+        lambda: list(SimilarRecipe.objects.filter(
+            recipe_id=recipe_id
+        ).order_by('-score', '-similar_id').values_list(
+            'similar_id', flat=True)),
+        CACHE_TIMEOUT
+    )
+    if not similar_ids and not Recipe.objects.filter(pk=recipe_id).exists():
+        return None
+    return similar_ids
@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла - sha256 его содержимого.
+
+    Повторная загрузка того же содержимого не создаёт новый файл, а
+    возвращает имя уже сохранённого. Файлы после сохранения не
+    меняются, поэтому удалять их при смене ссылки нельзя: ненужные
+    файлы удаляет команда collect_media_garbage.
+    """
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            try:
+                # Свежая дата изменения защищает файл от удаления
+                # collect_media_garbage, пока на него появляется ссылка.
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return super()._save(name, content)
@@ -0,0 +1,111 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connections, transaction
+from django.db.models import F
+from PIL import Image
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_WIDTHS = (320, 640)
+THUMBNAIL_FORMATS = (
+    ('webp', 'WEBP'),
+    ('jpg', 'JPEG'),
+)
+THUMBNAIL_QUALITY = 80
+# Миниатюра, которая отдаётся в списках рецептов.
+LIST_THUMBNAIL = (640, 'webp')
+
+# Имена миниатюр выводятся из имени исходника, поэтому они хранятся
+# без переименования по содержимому.
+thumbnail_storage = FileSystemStorage()
+_executor = None
+
+
+def get_thumbnail_name(name, width, extension):
+    """Имя миниатюры однозначно определяется именем исходного файла.
+
+    Расширение исходника остаётся в имени: иначе temp.png и temp.jpeg
+    получили бы одну и ту же миниатюру.
+    """
+    return f'{THUMBNAIL_DIR}/{os.path.basename(name)}_{width}.{extension}'
+
+
+def get_thumbnail_names(name):
+    return [get_thumbnail_name(name, width, extension)
+            for width in THUMBNAIL_WIDTHS
+            for extension, _ in THUMBNAIL_FORMATS]
+
+
+def save_thumbnails(image, name):
+    for width in THUMBNAIL_WIDTHS:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((width, thumbnail.height))
+        for extension, image_format in THUMBNAIL_FORMATS:
+            target = get_thumbnail_name(name, width, extension)
+            if thumbnail_storage.exists(target):
+                continue
+            if image_format == 'JPEG' and thumbnail.mode != 'RGB':
+                output = thumbnail.convert('RGB')
+            else:
+                output = thumbnail
+            buffer = BytesIO()
+            output.save(buffer, image_format, quality=THUMBNAIL_QUALITY)
+            thumbnail_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def make_thumbnails(recipe_id, name):
+    """Строит миниатюры изображения и отмечает их готовность у рецепта,
+    если изображение рецепта за это время не сменилось."""
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image.load()
+        save_thumbnails(image, name)
+    Recipe.objects.filter(pk=recipe_id, image=name).update(
+        thumbnail_source=name,
+        fragment_version=F('fragment_version') + 1
+    )
+
+
+def run_in_worker(recipe_id, name):
+    try:
+        make_thumbnails(recipe_id, name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', name)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def schedule_thumbnails(recipe):
+    """После фиксации транзакции ставит построение миниатюр в очередь
+    пула потоков."""
+    recipe_id, name = recipe.pk, recipe.image.name
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: make_thumbnails(recipe_id, name))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run_in_worker, recipe_id, name))
+
+
+def get_list_image_name(recipe):
+    """Имя миниатюры для списков или None, если она ещё не готова."""
+    if recipe.image and recipe.thumbnail_source == recipe.image.name:
+        return get_thumbnail_name(recipe.image.name, *LIST_THUMBNAIL)
+    return None
@@ -0,0 +1,79 @@
+import pytest
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import CustomUser
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.THUMBNAIL_WORKERS = 0
+    settings.PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username):
+        return CustomUser.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            password='password12345', first_name=username,
+            last_name=username
+        )
+    return make_user
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user('user')
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author')
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def make_recipes(db):
+    """Рецепты автора с тегами и ингредиентами."""
+    tags = Tag.objects.bulk_create(
+        Tag(name=f'Тег {index}', slug=f'tag{index}') for index in range(3))
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+        for index in range(5))
+
+    def make_recipes(author, count):
+        recipes = []
+        for index in range(count):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {index}', text='Описание',
+                cooking_time=index + 1, image=f'recipes/{index}.png')
+            recipe.tags.set(tags[:index % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=index + 1)
+                for ingredient in ingredients[:index % 5 + 1])
+            recipes.append(recipe)
+        return recipes
+    return make_recipes
@@ -0,0 +1,26 @@
+import json
+from io import StringIO
+
+import pytest
+
+from recipes.management.commands.csv_load import iter_json_array
+
+ITEMS = [
+    {'name': 'Соль "морская" [крупная]', 'measurement_unit': 'г'},
+    {'name': 'Вода', 'measurement_unit': 'мл'},
+    12345,
+]
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('chunk_size', [1, 3, 16, 1024])
+def test_iter_json_array(indent, chunk_size):
+    file = StringIO(json.dumps(ITEMS, ensure_ascii=False, indent=indent))
+
+    assert list(iter_json_array(file, chunk_size)) == ITEMS
+
+
+@pytest.mark.parametrize('text', ['', '{}', '[1, 2', '[1 2]', '[1,]'])
+def test_iter_json_array_invalid(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(StringIO(text), 2))
@@ -0,0 +1,75 @@
+import base64
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes import feed
+from recipes.models import FeedEntry, Ingredient, Tag
+
+
+def image_data():
+    buffer = BytesIO()
+    Image.new('RGB', (10, 10)).save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def as_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def publish(author, callbacks):
+    author.refresh_from_db()
+    tag = Tag.objects.create(name='Тег', slug='tag')
+    ingredient = Ingredient.objects.create(name='Соль', measurement_unit='г')
+    with callbacks(execute=True):
+        response = as_client(author).post('/api/recipes/', {
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 1,
+            'image': image_data(), 'tags': [tag.id],
+            'ingredients': [{'id': ingredient.id, 'amount': 1}],
+        }, format='json')
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def feed_ids(user):
+    response = as_client(user).get('/api/recipes/feed/')
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def subscribe(user, author):
+    response = as_client(user).post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_subscription_backfills_feed(
+        user, author, django_capture_on_commit_callbacks):
+    recipe_id = publish(author, django_capture_on_commit_callbacks)
+
+    subscribe(user, author)
+
+    assert feed_ids(user) == [recipe_id]
+
+
+@pytest.mark.django_db
+def test_feed_keeps_recipes_after_author_loses_subscribers(
+        monkeypatch, user, author, make_user,
+        django_capture_on_commit_callbacks):
+    monkeypatch.setattr(feed, 'FANOUT_SUBSCRIBERS_LIMIT', 1)
+    other = make_user('other')
+    subscribe(user, author)
+    subscribe(other, author)
+
+    recipe_id = publish(author, django_capture_on_commit_callbacks)
+    assert not FeedEntry.objects.filter(recipe_id=recipe_id).exists()
+    assert feed_ids(user) == [recipe_id]
+
+    response = as_client(other).delete(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 204
+    assert feed_ids(user) == [recipe_id]
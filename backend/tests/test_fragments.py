@@ -0,0 +1,59 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.representations import represent_recipe_fragment
+from recipes.cache import FRAGMENTS, set_many
+from recipes.fragments import FRAGMENT_TIMEOUT, get_fragment_keys
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def recipe(author, make_recipes):
+    return make_recipes(author, 1)[0]
+
+
+def get_name(client, recipe):
+    response = client.get(f'/api/recipes/{recipe.pk}/')
+    assert response.status_code == 200
+    return response.json()['name']
+
+
+def test_late_fragment_write_is_not_served(client, recipe):
+    stale = Recipe.objects.get(pk=recipe.pk)
+    stale_fragment = represent_recipe_fragment(stale)
+
+    recipe.name = 'Новое название'
+    recipe.save()
+    # Запрос, прочитавший рецепт до изменения, пишет в кэш позже него.
+    set_many(FRAGMENTS, {
+        get_fragment_keys([stale])[stale.pk]: stale_fragment
+    }, FRAGMENT_TIMEOUT)
+
+    assert get_name(client, recipe) == 'Новое название'
+
+
+def test_tag_change_invalidates_fragment(client, recipe):
+    assert get_name(client, recipe) == recipe.name
+    tag = recipe.tags.first()
+
+    recipe.tags.remove(tag)
+
+    response = client.get(f'/api/recipes/{recipe.pk}/')
+    assert tag.id not in [item['id'] for item in response.json()['tags']]
+
+
+def test_update_response_is_fresh(author, recipe):
+    client = APIClient()
+    client.force_authenticate(author)
+    get_name(client, recipe)
+
+    response = client.patch(f'/api/recipes/{recipe.pk}/', {
+        'name': 'Другое название',
+        'tags': [tag.id for tag in recipe.tags.all()],
+        'ingredients': [{'id': item.ingredient_id, 'amount': 1}
+                        for item in recipe.recipes.all()],
+    }, format='json')
+
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Другое название'
+    assert get_name(client, recipe) == 'Другое название'
@@ -0,0 +1,61 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes import ingredient_index
+from recipes.cache import REFERENCE, get_cache, get_version
+from recipes.models import RecipeIngredient
+
+
+@pytest.fixture
+def recipes(author, make_recipes, monkeypatch):
+    monkeypatch.setattr(ingredient_index, '_index', (None, None))
+    return make_recipes(author, 3)
+
+
+def replace_ingredients(recipe, ingredient_ids):
+    RecipeIngredient.objects.filter(recipe=recipe).delete()
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                         amount=1)
+        for ingredient_id in ingredient_ids)
+
+
+def test_index_applies_published_changes(recipes):
+    index = ingredient_index.get_ingredient_index()
+    recipe = recipes[0]
+    ingredient_id = RecipeIngredient.objects.exclude(
+        recipe=recipe).values_list('ingredient_id', flat=True).last()
+    replace_ingredients(recipe, [ingredient_id])
+
+    ingredient_index.update_recipe(recipe.id)
+    with CaptureQueriesContext(connection) as context:
+        updated = ingredient_index.get_ingredient_index()
+
+    assert updated is index
+    assert len(context) == 1
+    assert index.recipes[recipe.id] == (ingredient_id,)
+
+
+def test_index_reloads_without_change_log(recipes):
+    index = ingredient_index.get_ingredient_index()
+    ingredient_index.update_recipe(recipes[0].id)
+    get_cache(REFERENCE).delete(ingredient_index.get_change_key(
+        get_version(ingredient_index.VERSION)))
+
+    assert ingredient_index.get_ingredient_index() is not index
+
+
+def test_search_pages_match_full_ranking():
+    index = ingredient_index.IngredientIndex(
+        (recipe_id, ingredient_id)
+        for recipe_id in range(1, 20)
+        for ingredient_id in range(recipe_id % 4 + 1))
+    ranked = index.search([0, 1])
+    full = ranked[:]
+
+    assert len(ranked) == len(full) == 19
+    assert [coverage for _, coverage in full] == sorted(
+        (coverage for _, coverage in full), reverse=True)
+    assert ranked[6:12] == full[6:12]
+    assert ranked[0] == full[0]
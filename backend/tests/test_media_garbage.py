@@ -0,0 +1,32 @@
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from recipes.management.commands.collect_media_garbage import Command
+from recipes.storage import ContentAddressedStorage
+
+
+def test_dedup_refreshes_modified_time(tmp_path):
+    storage = ContentAddressedStorage(location=tmp_path)
+    name = storage.save('recipes/temp.png', ContentFile(b'image'))
+    os.utime(storage.path(name), (0, 0))
+    assert storage.save('recipes/other.png', ContentFile(b'image')) == name
+    assert os.path.getmtime(storage.path(name)) > 0
+
+
+def test_sweep_keeps_file_referenced_after_snapshot(
+        tmp_path, author, make_recipes):
+    storage = ContentAddressedStorage(location=tmp_path)
+    kept = storage.save('recipes/kept.png', ContentFile(b'kept'))
+    removed = storage.save('recipes/removed.png', ContentFile(b'removed'))
+    recipe, = make_recipes(author, 1)
+    recipe.image = kept
+    recipe.save()
+    command = Command()
+    deadline = timezone.now() + timedelta(minutes=1)
+    assert command.sweep(storage, 'recipes', set(), command.is_referenced,
+                         deadline, dry_run=False) == 1
+    assert storage.exists(kept)
+    assert not storage.exists(removed)
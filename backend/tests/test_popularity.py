@@ -0,0 +1,50 @@
+from django.utils import timezone
+
+from recipes.models import Favorite, RecipePopularity
+from recipes.popularity import SAFETY_WINDOW, rebuild, refresh
+
+
+def get_score(recipe):
+    return RecipePopularity.objects.get(recipe=recipe).score
+
+
+def test_refresh_counts_late_committed_activity(user, author, make_recipes):
+    recipe, other = make_recipes(author, 2)
+    Favorite.objects.create(user=user, recipe=other)
+    rebuild()
+    favorite = Favorite.objects.create(user=user, recipe=recipe)
+    # Событие получило created до прошлого обновления, а видно стало после.
+    Favorite.objects.filter(pk=favorite.pk).update(
+        created=timezone.now() - SAFETY_WINDOW / 2)
+    refresh()
+    assert get_score(recipe) > 0
+
+
+def test_refresh_is_idempotent(user, author, make_recipes):
+    recipe, = make_recipes(author, 1)
+    rebuild()
+    Favorite.objects.create(user=user, recipe=recipe)
+    refresh()
+    score = get_score(recipe)
+    refresh()
+    assert get_score(recipe) == score
+
+
+def test_popular_ordering_lists_every_recipe(client, user, author,
+                                             make_recipes):
+    first, second, third = make_recipes(author, 3)
+    Favorite.objects.create(user=user, recipe=second)
+    rebuild()
+    response = client.get('/api/recipes/?ordering=popular')
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        second.pk, third.pk, first.pk]
+
+
+def test_cursor_pagination_rejects_custom_ordering(client, author,
+                                                   make_recipes):
+    make_recipes(author, 2)
+    for params in ('ordering=popular', 'search=Рецепт'):
+        response = client.get(f'/api/recipes/?{params}&pagination=cursor')
+        assert response.status_code == 400
+    response = client.get('/api/recipes/?pagination=cursor')
+    assert response.status_code == 200
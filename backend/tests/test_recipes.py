@@ -0,0 +1,27 @@
+import pytest
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(client, url):
+    for cache in caches.all():
+        cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context), response.json()
+
+
+@pytest.mark.parametrize('client_name', ['client', 'user_client'])
+def test_recipe_list_queries_do_not_grow_with_page(
+        request, client_name, author, make_recipes):
+    client = request.getfixturevalue(client_name)
+    make_recipes(author, 10)
+
+    small, small_page = count_queries(client, '/api/recipes/?limit=2')
+    large, large_page = count_queries(client, '/api/recipes/?limit=10')
+
+    assert len(small_page['results']) == 2
+    assert len(large_page['results']) == 10
+    assert small == large
@@ -0,0 +1,117 @@
+import pytest
+from django.core.cache import caches
+from django.db.models import prefetch_related_objects
+from rest_framework.request import Request
+from rest_framework.serializers import ModelSerializer
+from rest_framework.test import APIRequestFactory
+
+from api.representations import (INGREDIENT_FIELDS, TAG_FIELDS, USER_FIELDS,
+                                 get_subscribed_ids, get_user_row,
+                                 represent_user)
+from api.serializers import (CustomUserSerializer, IngredientSerializer,
+                             RecipeReadSerializer, TagSerializer)
+from recipes.cache import FRAGMENTS
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart, Tag,
+                            get_recipe_prefetches)
+from users.models import CustomUser, Subscription
+
+RECIPES_COUNT = 30
+
+
+@pytest.fixture
+def request_context(user):
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    return {'request': request}
+
+
+@pytest.fixture
+def recipes(user, author, make_recipes):
+    CustomUser.objects.filter(pk=author.pk).update(avatar='avatars/a.png')
+    created = make_recipes(author, RECIPES_COUNT)
+    Subscription.objects.create(user=user, author=author)
+    Favorite.objects.create(user=user, recipe=created[0])
+    ShoppingCart.objects.create(user=user, recipe=created[1])
+    recipes = list(Recipe.objects.select_related('author').with_user_flags(
+        user))
+    prefetch_related_objects(recipes, *get_recipe_prefetches())
+    return recipes
+
+
+def represent_with_drf(recipes, context):
+    """Представление через поля DRF, как до кэша фрагментов."""
+    serializer = RecipeReadSerializer(context=context)
+    return [ModelSerializer.to_representation(serializer, recipe)
+            for recipe in recipes]
+
+
+def represent_lean(recipes, context):
+    return RecipeReadSerializer(recipes, many=True, context=context).data
+
+
+def test_recipes_match_drf(recipes, request_context):
+    expected = represent_with_drf(recipes, request_context)
+
+    assert represent_lean(recipes, request_context) == expected
+    # Второй раз фрагменты берутся из кэша.
+    assert represent_lean(recipes, request_context) == expected
+
+
+def test_users_match_drf(recipes, user, request_context):
+    users = CustomUser.objects.all()
+    request = request_context['request']
+    subscribed_ids = get_subscribed_ids(user)
+    expected = CustomUserSerializer(
+        users, many=True, context=request_context).data
+
+    assert [represent_user(row, request, subscribed_ids)
+            for row in users.values(*USER_FIELDS)] == expected
+    assert [represent_user(get_user_row(item), request, subscribed_ids)
+            for item in users] == expected
+
+
+def test_reference_data_match_drf(recipes):
+    assert list(Tag.objects.values(*TAG_FIELDS)) == TagSerializer(
+        Tag.objects.all(), many=True).data
+    assert list(Ingredient.objects.values(
+        *INGREDIENT_FIELDS)) == IngredientSerializer(
+        Ingredient.objects.all(), many=True).data
+
+
+@pytest.mark.benchmark(group='recipes')
+def test_benchmark_recipes_drf(benchmark, recipes, request_context):
+    benchmark(represent_with_drf, recipes, request_context)
+
+
+@pytest.mark.benchmark(group='recipes')
+def test_benchmark_recipes_lean_cache_miss(
+        benchmark, recipes, request_context):
+    benchmark.pedantic(
+        represent_lean, (recipes, request_context),
+        setup=caches[FRAGMENTS].clear, rounds=50)
+
+
+@pytest.mark.benchmark(group='recipes')
+def test_benchmark_recipes_lean_cache_hit(
+        benchmark, recipes, request_context):
+    represent_lean(recipes, request_context)
+    benchmark(represent_lean, recipes, request_context)
+
+
+@pytest.mark.benchmark(group='users')
+def test_benchmark_users_drf(benchmark, recipes, request_context):
+    users = list(CustomUser.objects.all())
+    benchmark(lambda: CustomUserSerializer(
+        users, many=True, context=dict(request_context)).data)
+
+
+@pytest.mark.benchmark(group='users')
+def test_benchmark_users_lean(benchmark, recipes, user, request_context):
+    rows = list(CustomUser.objects.values(*USER_FIELDS))
+    request = request_context['request']
+
+    def represent_users():
+        subscribed_ids = get_subscribed_ids(user)
+        return [represent_user(row, request, subscribed_ids) for row in rows]
+
+    benchmark(represent_users)
@@ -0,0 +1,55 @@
+import pytest
+
+from recipes.models import ShoppingCart
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.fixture
+def cart(user, author, make_recipes):
+    for recipe in make_recipes(author, 2):
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+
+
+@pytest.mark.parametrize('query, content_type', [
+    ('', 'application/pdf'),
+    ('?format=pdf', 'application/pdf'),
+    ('?format=txt', 'text/plain; charset=utf-8'),
+    ('?format=csv', 'text/csv; charset=utf-8'),
+])
+def test_download_formats(user_client, cart, query, content_type):
+    response = user_client.get(URL + query, HTTP_ACCEPT='application/json')
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == content_type
+
+
+def test_download_not_modified(user_client, cart):
+    etag = user_client.get(URL)['ETag']
+
+    response = user_client.get(URL, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize('query', ['', '?format=pdf'])
+def test_download_errors_are_json(client, db, query):
+    response = client.get(URL + query)
+
+    assert response.status_code == 401
+    assert response['Content-Type'] == 'application/json'
+
+
+@pytest.mark.parametrize('query', ['', '?format=docx'])
+def test_download_bad_request(user_client, query):
+    response = user_client.get(URL + query)
+
+    assert response.status_code == 400
+    assert response['Content-Type'] == 'application/json'
+
+
+def test_download_has_no_last_modified(user_client, cart):
+    response = user_client.get(URL)
+
+    assert 'ETag' in response
+    assert 'Last-Modified' not in response
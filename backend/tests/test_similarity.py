@@ -0,0 +1,23 @@
+from recipes import similarity
+from recipes.similarity import build_postings, nearest
+
+
+def test_nearest_skips_common_features(monkeypatch):
+    monkeypatch.setattr(similarity, 'COMMON_FEATURE_LIMIT', 3)
+    features = {
+        1: {-1, 10, 11},
+        2: {-1, 10},
+        3: {-1, 20},
+        4: {-1, 21},
+        5: {-1, 11, 22},
+    }
+    postings = build_postings(features)
+    assert [other for _, other in nearest(1, features, postings, 2)] == [
+        2, 5]
+
+
+def test_nearest_falls_back_to_shortest_column(monkeypatch):
+    monkeypatch.setattr(similarity, 'COMMON_FEATURE_LIMIT', 1)
+    features = {1: {-1, 10}, 2: {-1, 10}, 3: {-1}}
+    postings = build_postings(features)
+    assert nearest(3, features, postings) == [(0.5, 2), (0.5, 1)]
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from users.models import CustomUser, Subscription
+
+RECIPES_PER_AUTHOR = 3
+
+
+def subscribe_to_authors(user, count):
+    authors = CustomUser.objects.bulk_create(
+        CustomUser(username=f'author{index}',
+                   email=f'author{index}@example.com',
+                   first_name='Автор', last_name=str(index),
+                   recipes_count=RECIPES_PER_AUTHOR)
+        for index in range(count)
+    )
+    Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'Рецепт {index}', text='Описание',
+               cooking_time=1, image=f'recipes/{index}.png')
+        for author in authors
+        for index in range(RECIPES_PER_AUTHOR)
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author) for author in authors)
+
+
+def get_subscriptions(client, count, recipes_limit=2):
+    return client.get(f'/api/users/subscriptions/?limit={count}'
+                      f'&recipes_limit={recipes_limit}')
+
+
+@pytest.mark.django_db
+def test_subscriptions_queries_do_not_grow_with_authors(
+        user, user_client):
+    subscribe_to_authors(user, 60)
+
+    counts = []
+    for count in (5, 60):
+        with CaptureQueriesContext(connection) as context:
+            response = get_subscriptions(user_client, count)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == count
+        counts.append(len(context))
+
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.django_db
+def test_subscriptions_recipes_limit(user, user_client):
+    subscribe_to_authors(user, 3)
+
+    results = get_subscriptions(user_client, 3)
+    unlimited = get_subscriptions(user_client, 3, recipes_limit='abc')
+
+    for author in results.json()['results']:
+        assert len(author['recipes']) == 2
+        assert author['recipes_count'] == RECIPES_PER_AUTHOR
+    for author in unlimited.json()['results']:
+        assert len(author['recipes']) == RECIPES_PER_AUTHOR
+
+
+@pytest.mark.django_db
+def test_subscriptions_benchmark(benchmark, user, user_client):
+    subscribe_to_authors(user, 200)
+
+    response = benchmark(get_subscriptions, user_client, 200)
+
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 200
@@ -0,0 +1,8 @@
+from recipes.thumbnails import get_thumbnail_name, get_thumbnail_names
+
+
+def test_thumbnail_names_keep_source_extension():
+    assert get_thumbnail_name('recipes/temp.png', 640, 'webp') != (
+        get_thumbnail_name('recipes/temp.jpeg', 640, 'webp'))
+    assert not set(get_thumbnail_names('recipes/temp.png')) & set(
+        get_thumbnail_names('recipes/temp.jpeg'))
@@ -11,7 +11,9 @@ class UserAdmin(BaseUserAdmin):
         'username',
         'email',
         'first_name',
-        'last_name'
+        'last_name',
+        'recipes_count',
+        'subscribers_count'
     )
     search_fields = (
         'email',